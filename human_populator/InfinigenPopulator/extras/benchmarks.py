@@ -0,0 +1,184 @@
+import os
+import sys
+import time
+import tempfile
+
+import bpy
+import numpy as np
+from shapely.geometry import Point
+# noinspection PyUnresolvedReferences
+from mathutils.bvhtree import BVHTree
+
+from InfinigenPopulator.extras.utils import Utils
+from InfinigenPopulator.extras.mesh_arrays import get_world_vertices, get_polygon_normals, get_polygon_areas
+from InfinigenPopulator.managers.scene_manager import SceneManager
+from InfinigenPopulator.managers.character_manager import CharacterManager
+from InfinigenPopulator.logic.render_logic import RENDER_PROFILES, get_frames_folder, render_scene
+from InfinigenPopulator.logic.worker_pool import WorkerPool
+
+
+def time_call(func, repeats=5):
+    """Runs func repeats times and returns the best wall-clock time in seconds together with the last result."""
+    best_time = float("inf")
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best_time = min(best_time, time.perf_counter() - start)
+    return best_time, result
+
+
+def benchmark_grid_containment(floor_name, grid_spacing=0.35, repeats=5):
+    """Compares the per-point Polygon.contains loop with Utils.points_in_polygon on the placement grid of a floor."""
+    floor = bpy.data.objects.get(floor_name)
+    if not floor:
+        raise ValueError(f"Floor '{floor_name}' not found!")
+    _, _, floor_polygon, grid_points = Utils.get_floor_grid(floor, grid_spacing)
+
+    def loop_containment():
+        return np.array([
+            [x, y] for x, y in grid_points if floor_polygon.contains(Point(x, y))
+        ]).reshape(-1, 2)
+
+    def batched_containment():
+        return grid_points[Utils.points_in_polygon(floor_polygon, grid_points)]
+
+    loop_time, loop_points = time_call(loop_containment, repeats)
+    batched_time, batched_points = time_call(batched_containment, repeats)
+    if not np.array_equal(loop_points, batched_points):
+        raise RuntimeError("Batched containment result differs from the per-point loop!")
+
+    speedup = loop_time / batched_time if batched_time > 0 else float("inf")
+    print(f"Grid containment on '{floor_name}' ({len(grid_points)} grid points, {len(loop_points)} inside): "
+          f"loop {loop_time * 1000:.2f} ms, batched {batched_time * 1000:.2f} ms, speedup {speedup:.1f}x")
+    return {"grid_points": len(grid_points), "inside": len(loop_points), "loop_time": loop_time,
+            "batched_time": batched_time, "speedup": speedup}
+
+
+def benchmark_floor_geometry(floor_name, repeats=5):
+    """
+    Compares the per-element loops formerly used for the floor area and world floor vertices with the foreach_get
+    layer in mesh_arrays.
+    """
+    floor = bpy.data.objects.get(floor_name)
+    if not floor:
+        raise ValueError(f"Floor '{floor_name}' not found!")
+    mesh = floor.data
+
+    def loop_area():
+        return sum(face.area for face in mesh.polygons if abs(face.normal.dot((0, 0, 1))) > 0.999)
+
+    def batched_area():
+        areas = get_polygon_areas(mesh)
+        return float(areas[np.abs(get_polygon_normals(mesh)[:, 2]) > 0.999].sum())
+
+    def loop_vertices():
+        return np.array([tuple(floor.matrix_world @ v.co) for v in mesh.vertices]).reshape(-1, 3)
+
+    def batched_vertices():
+        return get_world_vertices(floor)
+
+    results = {"vertices": len(mesh.vertices), "polygons": len(mesh.polygons)}
+    for label, loop_func, batched_func in (("area", loop_area, batched_area),
+                                           ("vertices", loop_vertices, batched_vertices)):
+        loop_time, loop_result = time_call(loop_func, repeats)
+        batched_time, batched_result = time_call(batched_func, repeats)
+        if not np.allclose(loop_result, batched_result, atol=1e-5):
+            raise RuntimeError(f"Batched floor {label} differs from the per-element loop!")
+        results[f"{label}_loop_time"] = loop_time
+        results[f"{label}_batched_time"] = batched_time
+
+    saved_time = (results["area_loop_time"] + results["vertices_loop_time"]
+                  - results["area_batched_time"] - results["vertices_batched_time"])
+    print(f"Floor geometry of '{floor_name}' ({results['vertices']} vertices, {results['polygons']} polygons): "
+          f"area loop {results['area_loop_time'] * 1000:.2f} ms, batched {results['area_batched_time'] * 1000:.2f} ms; "
+          f"vertices loop {results['vertices_loop_time'] * 1000:.2f} ms, "
+          f"batched {results['vertices_batched_time'] * 1000:.2f} ms; saved {saved_time * 1000:.2f} ms per scene")
+    results["saved_time"] = saved_time
+    return results
+
+
+def benchmark_collision_proxy(character_path, repeats=5):
+    """
+    Imports a character and compares its convex collision proxy with the posed meshes: size, the time to build the
+    BVH tree of an exact check, and the bbox against the one of the full mesh and of the armature.
+    """
+    character_manager = CharacterManager(character_path)
+    character_manager.import_posed_fbx_character()
+    character = character_manager.character
+    proxy_vertices, proxy_triangles = Utils.get_convex_proxy(character)
+    vertices, polygons = Utils.get_posed_geometry(character, with_polygons=True)
+
+    mesh_time, _ = time_call(lambda: BVHTree.FromPolygons(vertices.tolist(), polygons), repeats)
+    proxy_time, _ = time_call(lambda: BVHTree.FromPolygons(proxy_vertices.tolist(), proxy_triangles.tolist()),
+                              repeats)
+    location = np.tile(np.array(character.location), 2)
+    mesh_aabb = np.concatenate([vertices.min(axis=0), vertices.max(axis=0)])
+    proxy_aabb = Utils.get_character_aabb(character, (proxy_vertices, proxy_triangles)) - location
+    armature_aabb = Utils.get_world_aabbs([character])[0] - location
+    results = {"mesh_polygons": len(polygons), "proxy_triangles": len(proxy_triangles), "mesh_time": mesh_time,
+               "proxy_time": proxy_time, "proxy_bbox_error": float(np.abs(proxy_aabb - mesh_aabb).max()),
+               "armature_bbox_error": float(np.abs(armature_aabb - mesh_aabb).max())}
+    print(f"Collision proxy of {character_manager.character_name}: {results['proxy_triangles']} triangles instead of "
+          f"{results['mesh_polygons']} polygons, BVH build {proxy_time * 1000:.3f} ms instead of "
+          f"{mesh_time * 1000:.3f} ms; bbox error against the mesh {results['proxy_bbox_error']:.3f} m "
+          f"(armature bbox {results['armature_bbox_error']:.3f} m)")
+    return results
+
+
+def benchmark_render_profiles(scene_folder, seed, camera_id, infinigen_path, mode="single-process"):
+    """
+    Renders one camera of a populated scene folder (<seed>/fine) with every render profile into a temporary output
+    folder and compares the wall-clock render times with the one of the production profile.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for profile in RENDER_PROFILES:
+            frames_folder = get_frames_folder(output_dir, profile)
+            os.makedirs(frames_folder)
+            start = time.perf_counter()
+            render_scene(os.path.abspath(scene_folder), frames_folder, seed, [tuple(camera_id)], cwd=infinigen_path,
+                         mode=mode, profile=profile)
+            results[profile] = time.perf_counter() - start
+    for profile, render_time in results.items():
+        speedup = results["production"] / render_time if render_time > 0 else float("inf")
+        print(f"Render profile {profile} of camera {tuple(camera_id)}: {render_time:.1f} s "
+              f"({speedup:.1f}x production)")
+    return results
+
+
+def benchmark_worker_pool(scenes_path, output_root, characters, infinigen_path, worker_counts=(1, 2, 4),
+                          **pool_options):
+    """
+    Populates and renders all seed folders of scenes_path once per number of workers, each time into a fresh
+    output_root/workers_<n> and without the population cache, and compares the scenes per hour of the runs.
+    pool_options are passed on to WorkerPool, e.g. render_mode and render_options.
+    """
+    pool_options.setdefault("population_options", {})["cache"] = False
+    results = {}
+    for num_workers in worker_counts:
+        output_dir = os.path.join(os.path.abspath(output_root), f"workers_{num_workers}")
+        if os.path.exists(output_dir):
+            raise ValueError(f"Benchmark output {output_dir} already exists, renders would be skipped!")
+        summary = WorkerPool(num_workers, output_dir, characters, infinigen_path, **pool_options).run(scenes_path)
+        results[num_workers] = {"succeeded": summary["succeeded"], **summary["throughput"]}
+    baseline = results[worker_counts[0]]["scenes_per_hour"]
+    for num_workers, result in results.items():
+        speedup = result["scenes_per_hour"] / baseline if baseline > 0 else float("inf")
+        print(f"{num_workers} workers: {result['succeeded']} scenes in {result['wall_time']:.1f} s, "
+              f"{result['scenes_per_hour']} scenes/h ({speedup:.2f}x {worker_counts[0]} workers), effective "
+              f"parallelism {result['effective_parallelism']}")
+    return results
+
+
+def main(scene_path, character_path=None):
+    scene_manager = SceneManager()
+    scene_manager.load_scene(scene_path)
+    benchmark_grid_containment(scene_manager.floor)
+    benchmark_floor_geometry(scene_manager.floor)
+    if character_path:
+        benchmark_collision_proxy(character_path)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
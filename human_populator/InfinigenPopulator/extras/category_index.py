@@ -0,0 +1,63 @@
+import re
+from collections import defaultdict
+
+import bpy
+
+
+# Separators of the parts of infinigen object names, e.g. 'ChairFactory(3951).spawn_asset(1772)'
+NAME_SEPARATORS = re.compile(r"[().]")
+
+
+class CategoryIndex:
+    """
+    Names of the scene objects (cameras excluded) grouped by the tokens of their names, the parts between '(', ')'
+    and '.', e.g. 'ChairFactory', '3951', 'spawn_asset' and '1772' for 'ChairFactory(3951).spawn_asset(1772)'.
+    Built in one pass at scene load, so a lookup only scans the distinct tokens instead of every object in the
+    scene.
+    """
+    _active = None
+
+    def __init__(self, objects):
+        self.tokens = defaultdict(list)
+        self._order = {}
+        self.insert(objects)
+
+    @classmethod
+    def from_scene(cls, scene):
+        return cls(scene.objects)
+
+    @classmethod
+    def set_active(cls, category_index):
+        cls._active = category_index
+
+    @classmethod
+    def get_active(cls):
+        """Returns the index of the loaded scene, building one for the current scene if none was loaded."""
+        if cls._active is None:
+            cls._active = cls.from_scene(bpy.context.scene)
+        return cls._active
+
+    def insert(self, objects):
+        """Adds objects created after the index was built, e.g. imported characters."""
+        for obj in objects:
+            if obj.type == "CAMERA" or obj.name in self._order:
+                continue
+            self._order[obj.name] = len(self._order)
+            for token in set(NAME_SEPARATORS.split(obj.name)):
+                self.tokens[token].append(obj.name)
+
+    def find(self, keyword, spawn_asset=None, name_contains=None):
+        """
+        Returns the names of all objects whose name contains keyword, in scene order. spawn_asset=True/False keeps
+        only the objects with/without 'spawn_asset' in their name, name_contains filters on any other substring.
+        """
+        if NAME_SEPARATORS.search(keyword):
+            # A keyword with separators can span several tokens, it is matched against the whole names
+            names = [name for name in self._order if keyword in name]
+        else:
+            names = {name for token, token_names in self.tokens.items() if keyword in token for name in token_names}
+        if spawn_asset is not None:
+            names = [name for name in names if ("spawn_asset" in name) == spawn_asset]
+        if name_contains is not None:
+            names = [name for name in names if name_contains in name]
+        return sorted(names, key=self._order.get)
@@ -0,0 +1,173 @@
+import os
+import re
+import time
+import argparse
+
+import bpy
+# noinspection PyUnresolvedReferences
+import numpy as np
+
+from InfinigenPopulator.extras.utils import Utils
+from InfinigenPopulator.extras.verification import verify_characters
+from InfinigenPopulator.extras.file_io import sha256_file, write_json_atomic, read_json
+from InfinigenPopulator.extras.character_library import CharacterLibrary
+from InfinigenPopulator.managers.character_manager import CharacterManager
+
+CHARACTER_INDEX = "character_index.json"
+# Substrings of the character paths that process_scene selects characters by
+CHARACTER_KEYWORDS = ("smpli", "doing", "chair", "watering", "eating", "sleeping", "working-computer")
+POSE_KEYWORDS = ("chair", "watering", "eating", "sleeping", "working-computer")
+
+
+def get_characters_root(character_path):
+    """Characters are stored as <characters root>/<character folder>/<file>.fbx."""
+    return os.path.dirname(os.path.dirname(os.path.abspath(character_path)))
+
+
+class CharacterIndex:
+    """
+    Manifest of the character FBX files of a characters folder, stored in <characters>/character_index.json with
+    one record per FBX: keywords, pose keyword, rig type, interacted object, bbox and footprint as imported, bone
+    names and sha256. Selecting characters only needs the manifest, it is neither checked against the files nor
+    updated while populating. build() updates it incrementally, only new or changed files are imported again.
+    """
+
+    # characters root -> CharacterIndex (None without one), loaded once per session
+    _loaded = {}
+
+    def __init__(self, characters_root):
+        self.characters_root = os.path.abspath(characters_root)
+        self.path = os.path.join(self.characters_root, CHARACTER_INDEX)
+        data = read_json(self.path) or {}
+        self.records = data.get("characters", {})
+
+    @classmethod
+    def get(cls, characters_root):
+        """Returns the index of characters_root as read on the first call of the session, or None without one."""
+        characters_root = os.path.abspath(characters_root)
+        if characters_root not in cls._loaded:
+            path = os.path.join(characters_root, CHARACTER_INDEX)
+            cls._loaded[characters_root] = cls(characters_root) if os.path.isfile(path) else None
+        return cls._loaded[characters_root]
+
+    def is_up_to_date(self):
+        """
+        Whether there is a record for every FBX file of the folder, with the size and mtime the file has now. Lists
+        and stats the whole folder, so only the indexing command checks it.
+        """
+        relative_paths = [os.path.relpath(path, self.characters_root)
+                          for path in verify_characters(self.characters_root)]
+        if sorted(relative_paths) != sorted(self.records):
+            return False
+        for relative_path, record in self.records.items():
+            stat = os.stat(os.path.join(self.characters_root, relative_path))
+            if [record["size"], record["mtime_ns"]] != [stat.st_size, stat.st_mtime_ns]:
+                return False
+        return True
+
+    def _save(self):
+        write_json_atomic(self.path, {"characters": dict(sorted(self.records.items()))})
+
+    def get_character_paths(self):
+        return [os.path.join(self.characters_root, relative_path) for relative_path in sorted(self.records)]
+
+    def get_record(self, character_path):
+        return self.records.get(os.path.relpath(os.path.abspath(character_path), self.characters_root))
+
+    def has_keyword(self, character_path, keyword):
+        """Whether the character matches the keyword, None if it is not in the index."""
+        record = self.get_record(character_path)
+        if record is None:
+            return None
+        return keyword in record["keywords"]
+
+    @staticmethod
+    def get_rig_type(character_name):
+        return re.split(r"[_|-]", character_name)[0].lower()
+
+    @staticmethod
+    def index_character(character_path, character_library=None):
+        """Imports the character into an empty session and returns the metadata of its record."""
+        bpy.ops.wm.read_homefile(use_empty=True)
+        character_manager = CharacterManager(character_path, character_library=character_library)
+        character_manager.import_posed_fbx_character()
+        character = character_manager.character
+        if character is None:
+            raise RuntimeError(f"No SMPL armature found in {character_path}!")
+        meshes = [obj for obj in character.children if obj.type == "MESH"]
+        aabbs = Utils.get_world_aabbs(meshes or [character])
+        location = np.tile(np.array(character.location), 2)
+        bbox = np.concatenate([aabbs[:, :3].min(axis=0), aabbs[:, 3:].max(axis=0)]) - location
+        return {"rig_type": CharacterIndex.get_rig_type(character_manager.character_name),
+                "interacted_object": character_manager.interacted_obj.name if character_manager.interacted_obj
+                else None,
+                "bbox": bbox.tolist(),
+                "footprint": Utils.get_footprint_hull(character).tolist(),
+                "bones": [bone.name for bone in character.data.bones]}
+
+    def build(self, force=False, character_library=None):
+        """
+        Indexes the FBX files of the characters folder. A record is kept if its file has the same size and
+        modification time, or the same sha256, as when it was indexed. Records of removed files are dropped.
+        """
+        character_library = character_library or CharacterLibrary()
+        character_paths = verify_characters(self.characters_root)
+        relative_paths = {os.path.relpath(path, self.characters_root): path for path in character_paths}
+        removed = [relative_path for relative_path in self.records if relative_path not in relative_paths]
+        for relative_path in removed:
+            del self.records[relative_path]
+        kept, indexed = 0, 0
+        start = time.perf_counter()
+        for relative_path, character_path in relative_paths.items():
+            stat = os.stat(character_path)
+            record = self.records.get(relative_path)
+            if not force and record and [record["size"], record["mtime_ns"]] == [stat.st_size, stat.st_mtime_ns]:
+                kept += 1
+                continue
+            checksum = sha256_file(character_path)
+            if not force and record and record["sha256"] == checksum:
+                record["size"], record["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+                kept += 1
+                continue
+            print(f"Indexing {relative_path}")
+            name = os.path.splitext(os.path.basename(character_path))[0]
+            self.records[relative_path] = {
+                "name": name,
+                "keywords": [keyword for keyword in CHARACTER_KEYWORDS if keyword in relative_path],
+                "pose_keyword": next((keyword for keyword in POSE_KEYWORDS if keyword in relative_path), None),
+                **CharacterIndex.index_character(character_path, character_library),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": checksum}
+            indexed += 1
+            # A run that is interrupted keeps the records it already has
+            self._save()
+        bpy.ops.wm.read_homefile(use_empty=True)
+        self._save()
+        print(f"Character index {self.path}: {indexed} indexed, {kept} unchanged, {len(removed)} removed "
+              f"in {time.perf_counter() - start:.1f} s")
+
+
+def get_characters(characters_root):
+    """Returns the character paths from the index of characters_root, or by walking the folder without one."""
+    character_index = CharacterIndex.get(characters_root)
+    if character_index is not None:
+        return character_index.get_character_paths()
+    return verify_characters(characters_root)
+
+
+def main():
+    """Builds or updates the character index of a characters folder."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("characters")
+    parser.add_argument("--force", action="store_true", help="Index every character again.")
+    args = parser.parse_args()
+    character_index = CharacterIndex(args.characters)
+    if not args.force and character_index.is_up_to_date():
+        print(f"Character index {character_index.path} is up to date.")
+        return
+    character_index.build(args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import time
+import hashlib
+import argparse
+
+import bpy
+
+from InfinigenPopulator.extras.utils import DEFAULT_CACHE_DIR
+from InfinigenPopulator.extras.file_io import sha256_file, write_json_atomic, read_json
+from InfinigenPopulator.extras.verification import verify_characters
+
+
+class CharacterLibrary:
+    """
+    On-disk cache of the imported character FBX files as .blend libraries, one <sha256 of the FBX>.blend per
+    character. A small index file per FBX path remembers its modification time and size, so the FBX is only hashed
+    again when it changed. Appending the objects of a library is much faster than parsing the FBX with its skin
+    weights and animation.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = os.path.join(cache_dir or DEFAULT_CACHE_DIR, "character_libraries")
+
+    def _index_path(self, character_path):
+        key = hashlib.sha1(os.path.abspath(character_path).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get_library_path(self, character_path):
+        """Returns the path of the .blend library of the FBX in its current version (which may not exist yet)."""
+        stat = os.stat(character_path)
+        signature = [os.path.abspath(character_path), stat.st_mtime_ns, stat.st_size]
+        index_path = self._index_path(character_path)
+        entry = read_json(index_path)
+        if entry is None or entry.get("signature") != signature:
+            entry = {"signature": signature, "sha256": sha256_file(character_path)}
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_json_atomic(index_path, entry)
+        return os.path.join(self.cache_dir, f"{entry['sha256']}.blend")
+
+    @staticmethod
+    def import_fbx(character_path):
+        existing_objects = set(bpy.data.objects)
+        bpy.ops.import_scene.fbx(filepath=character_path)
+        return set(bpy.data.objects) - existing_objects
+
+    @staticmethod
+    def append_library(library_path):
+        """Appends all objects of the library to the active collection, like the FBX importer, and returns them."""
+        with bpy.data.libraries.load(library_path, link=False) as (data_from, data_to):
+            data_to.objects = data_from.objects
+        collection = bpy.context.collection
+        for obj in data_to.objects:
+            collection.objects.link(obj)
+        bpy.context.view_layer.update()
+        return set(data_to.objects)
+
+    @staticmethod
+    def write_library(library_path, objects):
+        """Writes the objects with everything they use (meshes, armatures, materials, actions) to library_path."""
+        tmp_path = f"{library_path[:-len('.blend')]}.{os.getpid()}.tmp.blend"
+        bpy.data.libraries.write(tmp_path, set(objects), fake_user=True)
+        os.replace(tmp_path, library_path)
+
+    def import_character(self, character_path):
+        """
+        Imports the character FBX from its library, or from the FBX itself if there is no library for this version
+        of it yet, in which case the library is written right after the import. Returns the new objects.
+        """
+        library_path = self.get_library_path(character_path)
+        if os.path.isfile(library_path):
+            return CharacterLibrary.append_library(library_path)
+        new_objects = CharacterLibrary.import_fbx(character_path)
+        CharacterLibrary.write_library(library_path, new_objects)
+        print("Cached character library of", character_path)
+        return new_objects
+
+    def build(self, characters, force=False):
+        """
+        Converts every character FBX into its library, each in an empty session, and measures the import time of
+        the FBX against the one of the library. Returns {character path: (fbx seconds, library seconds)}.
+        """
+        timings = {}
+        for character_path in characters:
+            library_path = self.get_library_path(character_path)
+            if force and os.path.isfile(library_path):
+                os.remove(library_path)
+            bpy.ops.wm.read_homefile(use_empty=True)
+            start = time.perf_counter()
+            new_objects = CharacterLibrary.import_fbx(character_path)
+            fbx_time = time.perf_counter() - start
+            if not os.path.isfile(library_path):
+                CharacterLibrary.write_library(library_path, new_objects)
+            bpy.ops.wm.read_homefile(use_empty=True)
+            start = time.perf_counter()
+            CharacterLibrary.append_library(library_path)
+            library_time = time.perf_counter() - start
+            timings[character_path] = (fbx_time, library_time)
+            print(f"{os.path.basename(character_path)}: FBX {fbx_time:.3f} s, library {library_time:.3f} s "
+                  f"({fbx_time / library_time if library_time > 0 else float('inf'):.1f}x)")
+        bpy.ops.wm.read_homefile(use_empty=True)
+        if timings:
+            fbx_total = sum(fbx_time for fbx_time, _ in timings.values())
+            library_total = sum(library_time for _, library_time in timings.values())
+            print(f"{len(timings)} characters: FBX {fbx_total:.2f} s, library {library_total:.2f} s")
+        return timings
+
+
+def main():
+    """Converts all characters of a characters folder into .blend libraries ahead of population."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("characters")
+    parser.add_argument("--cache-dir", default=None, help=f"Cache root (default: {DEFAULT_CACHE_DIR}).")
+    parser.add_argument("--force", action="store_true", help="Convert again even if a library is up to date.")
+    args = parser.parse_args()
+    CharacterLibrary(args.cache_dir).build(verify_characters(args.characters), args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import time
+
+import bpy
+# noinspection PyUnresolvedReferences
+import bmesh
+# noinspection PyUnresolvedReferences
+import numpy as np
+# noinspection PyUnresolvedReferences
+from mathutils.bvhtree import BVHTree
+
+from InfinigenPopulator.extras.utils import Utils
+
+
+class CollisionChecker:
+    """
+    Exact mesh-vs-mesh collision tests for ground placement. The BVH tree of every obstacle is built once from its
+    evaluated mesh in world space and cached for the scene. It is only consulted for candidates that the bbox test
+    rejected, so it can only add placements (e.g. under tables or in the free corner of an L-shaped sofa).
+    """
+
+    def __init__(self):
+        self._obstacle_trees = {}
+        self._obstacle_aabbs = {}
+        self.checks = 0
+        self.recovered = 0
+        self.build_time = 0.0
+        self.check_time = 0.0
+
+    def get_obstacle_tree(self, obj):
+        if obj.name not in self._obstacle_trees:
+            start = time.perf_counter()
+            tree = None
+            if obj.type == "MESH":
+                bm = bmesh.new()
+                bm.from_object(obj, bpy.context.evaluated_depsgraph_get())
+                bm.transform(obj.matrix_world)
+                tree = BVHTree.FromBMesh(bm)
+                bm.free()
+            self._obstacle_trees[obj.name] = tree
+            self._obstacle_aabbs[obj.name] = Utils.get_world_aabbs([obj])[0]
+            self.build_time += time.perf_counter() - start
+        return self._obstacle_trees[obj.name]
+
+    def bind(self, character, rotation=0, proxy=None):
+        """
+        Returns exact_check(position, obstacles) for the character placed with the given rotation (degrees,
+        counter-clockwise like rotate_character), as expected by the placement helpers. With a collision proxy
+        (already rotated, see Utils.rotate_proxy), its few dozen triangles are tested instead of the posed meshes.
+        """
+        if proxy is not None:
+            vertices, polygons = np.array(proxy[0], dtype=float), np.asarray(proxy[1]).tolist()
+        else:
+            vertices, polygons = Utils.get_posed_geometry(character, with_polygons=True)
+            if len(vertices) == 0:
+                return lambda position, obstacles: False
+            vertices[:, :2] = Utils.rotate_footprint(vertices[:, :2], rotation)
+
+        def exact_check(position, obstacles):
+            start = time.perf_counter()
+            self.checks += 1
+            placed_vertices = vertices + np.asarray(position, dtype=float)
+            character_min, character_max = placed_vertices.min(axis=0), placed_vertices.max(axis=0)
+            character_tree = BVHTree.FromPolygons(placed_vertices.tolist(), polygons)
+            is_free = True
+            for obj in obstacles:
+                obstacle_tree = self.get_obstacle_tree(obj)
+                if obstacle_tree is None:
+                    continue
+                obstacle_aabb = self._obstacle_aabbs[obj.name]
+                # Surfaces that do not intersect can still mean the character is enclosed by the obstacle
+                enclosed = np.all(character_min >= obstacle_aabb[:3]) and np.all(character_max <= obstacle_aabb[3:])
+                if enclosed or character_tree.overlap(obstacle_tree):
+                    is_free = False
+                    break
+            if is_free:
+                self.recovered += 1
+            self.check_time += time.perf_counter() - start
+            return is_free
+
+        return exact_check
+
+    def pop_stats(self):
+        """Returns the counters since the last call, e.g. per character, and resets them."""
+        stats = {"checks": self.checks, "recovered": self.recovered, "build_time": self.build_time,
+                 "check_time": self.check_time}
+        self.checks = 0
+        self.recovered = 0
+        self.build_time = 0.0
+        self.check_time = 0.0
+        return stats
@@ -0,0 +1,30 @@
+import os
+import json
+import hashlib
+
+
+def sha256_file(path, chunk_size=1 << 20):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def write_json_atomic(path, data, indent=4):
+    """Writes data to a tmp file next to path and renames it, readers never see a partially written file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as json_file:
+        json.dump(data, json_file, indent=indent)
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    """Returns the data of a JSON file, or None if it is missing or unreadable."""
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'r') as json_file:
+            return json.load(json_file)
+    except (OSError, json.JSONDecodeError):
+        return None
@@ -0,0 +1,61 @@
+import hashlib
+import os
+
+# noinspection PyUnresolvedReferences
+import numpy as np
+
+from InfinigenPopulator.extras.utils import Utils, DEFAULT_CACHE_DIR
+from InfinigenPopulator.extras.file_io import write_json_atomic, read_json
+
+
+class FootprintCache:
+    """
+    On-disk cache of the 2D convex-hull footprint and the convex collision proxy of each posed character asset, one
+    JSON file per FBX path. An entry is recomputed when the modification time or size of the FBX changes, a proxy
+    also when it was built by an older version of Utils.get_convex_proxy.
+    """
+
+    PROXY_VERSION = 3
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = os.path.join(cache_dir or DEFAULT_CACHE_DIR, "footprints")
+        self._entries = {}
+
+    def _entry_path(self, character_path):
+        key = hashlib.sha1(os.path.abspath(character_path).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _write_entry(self, entry_path, entry):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        write_json_atomic(entry_path, entry, indent=None)
+
+    def _get_entry(self, character_path):
+        stat = os.stat(character_path)
+        signature = [os.path.abspath(character_path), stat.st_mtime_ns, stat.st_size]
+        entry_path = self._entry_path(character_path)
+
+        entry = self._entries.get(entry_path) or read_json(entry_path)
+        if entry is None or entry.get("signature") != signature:
+            entry = {"signature": signature}
+        self._entries[entry_path] = entry
+        return entry_path, entry
+
+    def get(self, character_path, character):
+        """Returns the cached footprint (K x 2, relative to the character location) of the imported character."""
+        entry_path, entry = self._get_entry(character_path)
+        if "footprint" not in entry:
+            entry["footprint"] = Utils.get_footprint_hull(character).tolist()
+            self._write_entry(entry_path, entry)
+            print("Cached footprint of", character_path)
+        return np.array(entry["footprint"])
+
+    def get_proxy(self, character_path, character):
+        """Returns the cached collision proxy (vertices, triangles) of the imported character, see get_convex_proxy."""
+        entry_path, entry = self._get_entry(character_path)
+        if entry.get("proxy", {}).get("version") != FootprintCache.PROXY_VERSION:
+            vertices, triangles = Utils.get_convex_proxy(character)
+            entry["proxy"] = {"version": FootprintCache.PROXY_VERSION, "vertices": vertices.tolist(),
+                              "triangles": triangles.tolist()}
+            self._write_entry(entry_path, entry)
+            print(f"Cached collision proxy of {character_path} ({len(triangles)} triangles)")
+        return np.array(entry["proxy"]["vertices"]), np.array(entry["proxy"]["triangles"])
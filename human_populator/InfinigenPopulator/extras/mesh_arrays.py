@@ -0,0 +1,45 @@
+# noinspection PyUnresolvedReferences
+import numpy as np
+
+
+def transform_points(points, matrix_world):
+    """Applies the 4 x 4 matrix_world to the N x 3 points in a single matrix multiply."""
+    matrix_world = np.array(matrix_world)
+    return np.asarray(points, dtype=float).reshape(-1, 3) @ matrix_world[:3, :3].T + matrix_world[:3, 3]
+
+
+def get_vertex_coordinates(mesh):
+    """Returns the N x 3 local vertex coordinates of the mesh."""
+    coords = np.empty(len(mesh.vertices) * 3)
+    mesh.vertices.foreach_get("co", coords)
+    return coords.reshape(-1, 3)
+
+
+def get_world_vertices(obj):
+    """Returns the N x 3 world space vertex coordinates of the mesh object, in vertex order."""
+    return transform_points(get_vertex_coordinates(obj.data), obj.matrix_world)
+
+
+def get_polygon_normals(mesh):
+    """Returns the P x 3 local normals of the mesh polygons."""
+    normals = np.empty(len(mesh.polygons) * 3)
+    mesh.polygons.foreach_get("normal", normals)
+    return normals.reshape(-1, 3)
+
+
+def get_polygon_areas(mesh):
+    """Returns the local areas of the mesh polygons."""
+    areas = np.empty(len(mesh.polygons))
+    mesh.polygons.foreach_get("area", areas)
+    return areas
+
+
+def get_polygon_vertex_indices(mesh):
+    """Returns the vertex indices of each mesh polygon as a list of lists."""
+    loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+    return [loop_vertices[start:start + total].tolist() for start, total in zip(loop_starts, loop_totals)]
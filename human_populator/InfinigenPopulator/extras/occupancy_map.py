@@ -0,0 +1,202 @@
+import bpy
+# noinspection PyUnresolvedReferences
+import numpy as np
+from shapely.geometry import Polygon
+
+from InfinigenPopulator.extras.utils import Utils
+
+
+class OccupancyMap:
+    """
+    2D raster of the chosen floor. Cells are blocked when they lie outside the floor polygon, under a piece of
+    furniture (static layer, rasterized once) or under an already placed character (dynamic layer, stamped
+    incrementally). Rectangle queries are answered in constant time from a summed-area table.
+    """
+
+    def __init__(self, floor_name, cell_size=0.05, obstacle_height=1.8, floor_clearance=0.05):
+        floor = bpy.data.objects.get(floor_name)
+        if not floor:
+            raise ValueError(f"Floor '{floor_name}' not found!")
+        self.floor_name = floor_name
+        self.cell_size = cell_size
+
+        _, self.z, floor_polygon = Utils.get_floor_polygon(floor)
+        self.bounds = floor_polygon.bounds
+        x_min, y_min, x_max, y_max = self.bounds
+        self.origin = np.array([x_min, y_min])
+        self.shape = (max(int(np.ceil((y_max - y_min) / cell_size)), 1),
+                      max(int(np.ceil((x_max - x_min) / cell_size)), 1))
+
+        rows, cols = np.indices(self.shape)
+        cell_centers = np.stack([cols.ravel(), rows.ravel()], axis=1) * cell_size + self.origin + cell_size / 2
+        self.outside = ~Utils.points_in_polygon(floor_polygon, cell_centers).reshape(self.shape)
+        self.static = np.zeros(self.shape, dtype=bool)
+        self.dynamic = np.zeros(self.shape, dtype=bool)
+        self._blocked = {}
+        self._integral = {}
+
+        self.furniture, self.furniture_aabbs = self._collect_furniture(obstacle_height, floor_clearance)
+        for aabb in self.furniture_aabbs:
+            self._stamp(self.static, aabb[[0, 1, 3, 4]])
+
+    def _collect_furniture(self, obstacle_height, floor_clearance):
+        meshes = [obj for obj in bpy.context.scene.objects
+                  if obj.type == "MESH" and obj.name != self.floor_name and "floor" not in obj.name.lower()]
+        aabbs = Utils.get_world_aabbs(meshes)
+        x_min, y_min, x_max, y_max = self.bounds
+
+        overlaps_floor = ((aabbs[:, 0] <= x_max) & (aabbs[:, 3] >= x_min) &
+                          (aabbs[:, 1] <= y_max) & (aabbs[:, 4] >= y_min))
+        # Rugs and similar flat objects can be stood on, anything hanging above head height can be walked under
+        in_height_band = (aabbs[:, 5] > self.z + floor_clearance) & (aabbs[:, 2] < self.z + obstacle_height)
+        # Room shells (walls, exterior) span the whole floor, their bbox says nothing about the free space inside
+        covers_floor = ((aabbs[:, 0] <= x_min) & (aabbs[:, 3] >= x_max) &
+                        (aabbs[:, 1] <= y_min) & (aabbs[:, 4] >= y_max))
+        is_furniture = overlaps_floor & in_height_band & ~covers_floor
+        return [obj for obj, keep in zip(meshes, is_furniture) if keep], aabbs[is_furniture]
+
+    def _cell_range(self, footprint):
+        col_min, row_min = np.floor((np.asarray(footprint[:2]) - self.origin) / self.cell_size).astype(int)
+        col_max, row_max = np.ceil((np.asarray(footprint[2:]) - self.origin) / self.cell_size).astype(int)
+        rows, cols = self.shape
+        return (int(np.clip(row_min, 0, rows)), int(np.clip(row_max, 0, rows)),
+                int(np.clip(col_min, 0, cols)), int(np.clip(col_max, 0, cols)))
+
+    def _stamp(self, layer, footprint):
+        row_min, row_max, col_min, col_max = self._cell_range(footprint)
+        layer[row_min:row_max, col_min:col_max] = True
+        self._blocked.clear()
+        self._integral.clear()
+
+    def _get_blocked(self, include_furniture=True):
+        if include_furniture not in self._blocked:
+            blocked = self.outside | self.dynamic
+            self._blocked[include_furniture] = blocked | self.static if include_furniture else blocked
+        return self._blocked[include_furniture]
+
+    def _get_integral(self, include_furniture=True):
+        if include_furniture not in self._integral:
+            integral = np.zeros((self.shape[0] + 1, self.shape[1] + 1), dtype=np.int32)
+            integral[1:, 1:] = self._get_blocked(include_furniture).cumsum(axis=0).cumsum(axis=1)
+            self._integral[include_furniture] = integral
+        return self._integral[include_furniture]
+
+    @staticmethod
+    def get_footprint(obj):
+        """
+        Returns the 2D bbox (min x, min y, max x, max y) of the posed meshes below obj relative to obj.location.
+        The bound_box of a skinned mesh is the one of its rest pose, so the evaluated vertices are used.
+        """
+        hull = Utils.get_footprint_hull(obj)
+        return np.concatenate([hull.min(axis=0), hull.max(axis=0)])
+
+    def free_mask(self, positions, footprint, include_furniture=True):
+        """Returns a boolean mask of the positions at which the relative footprint only covers free cells."""
+        if len(positions) == 0:
+            return np.zeros(0, dtype=bool)
+        positions = np.asarray(positions, dtype=float)[:, :2]
+        cell_min = np.floor((positions + footprint[:2] - self.origin) / self.cell_size).astype(int)
+        cell_max = np.ceil((positions + footprint[2:] - self.origin) / self.cell_size).astype(int)
+        rows, cols = self.shape
+        in_bounds = np.all(cell_min >= 0, axis=1) & (cell_max[:, 0] <= cols) & (cell_max[:, 1] <= rows)
+
+        col_min, col_max = np.clip(cell_min[:, 0], 0, cols), np.clip(cell_max[:, 0], 0, cols)
+        row_min, row_max = np.clip(cell_min[:, 1], 0, rows), np.clip(cell_max[:, 1], 0, rows)
+        integral = self._get_integral(include_furniture)
+        blocked_cells = (integral[row_max, col_max] - integral[row_min, col_max]
+                         - integral[row_max, col_min] + integral[row_min, col_min])
+        return in_bounds & (blocked_cells == 0)
+
+    def polygon_free_mask(self, positions, polygon, include_furniture=True):
+        """
+        Like free_mask for a 2D footprint polygon (K x 2, relative to the position). Positions whose polygon bbox
+        is already free are accepted in constant time, the others are rasterized exactly at the cell centers.
+        """
+        if len(positions) == 0:
+            return np.zeros(0, dtype=bool)
+        positions = np.asarray(positions, dtype=float)[:, :2]
+        polygon = np.asarray(polygon, dtype=float)
+        free = self.free_mask(positions, np.concatenate([polygon.min(axis=0), polygon.max(axis=0)]),
+                              include_furniture)
+        undecided = np.flatnonzero(~free)
+        if len(undecided) == 0:
+            return free
+
+        # Window of cells around the polygon bbox, the same size for every position
+        cell_min = np.floor((positions[undecided] + polygon.min(axis=0) - self.origin) / self.cell_size).astype(int)
+        window = np.ceil((polygon.max(axis=0) - polygon.min(axis=0)) / self.cell_size).astype(int) + 1
+        window_cols, window_rows = np.meshgrid(np.arange(window[0]), np.arange(window[1]))
+        cols = cell_min[:, 0, None] + window_cols.ravel()
+        rows = cell_min[:, 1, None] + window_rows.ravel()
+
+        centers_x = (cols + 0.5) * self.cell_size + self.origin[0] - positions[undecided, 0, None]
+        centers_y = (rows + 0.5) * self.cell_size + self.origin[1] - positions[undecided, 1, None]
+        covered = Utils.points_in_polygon(Polygon(polygon), np.stack([centers_x.ravel(), centers_y.ravel()], axis=1))
+        covered = covered.reshape(cols.shape)
+
+        map_rows, map_cols = self.shape
+        in_bounds = (rows >= 0) & (rows < map_rows) & (cols >= 0) & (cols < map_cols)
+        blocked = np.ones(cols.shape, dtype=bool)
+        blocked[in_bounds] = self._get_blocked(include_furniture)[rows[in_bounds], cols[in_bounds]]
+        free[undecided] = ~np.any(covered & blocked, axis=1)
+        return free
+
+    def is_free(self, position, footprint):
+        return bool(self.free_mask([position], footprint)[0])
+
+    def placeable_mask(self, positions, character, footprint=None, exact_check=None, proxy=None):
+        """
+        Returns a boolean mask of the positions at which the character fits. An optional 2D footprint polygon
+        (e.g. rotated for the placement angle) replaces the bbox of the character. With exact_check, positions
+        that are only blocked by furniture bboxes get a second chance: exact_check(position, obstacles) is called
+        with the furniture whose bbox overlaps the character there. A collision proxy (see Utils.get_convex_proxy)
+        replaces the bbox of the armature and its meshes.
+        """
+        if len(positions) == 0:
+            return np.zeros(0, dtype=bool)
+        positions = np.asarray(positions, dtype=float)
+        if footprint is not None:
+            footprint = np.asarray(footprint, dtype=float)
+            mask = lambda points, include_furniture: self.polygon_free_mask(points, footprint, include_furniture)
+            bbox = np.concatenate([footprint.min(axis=0), footprint.max(axis=0)])
+        else:
+            if proxy is not None:
+                proxy_aabb = Utils.get_character_aabb(character, proxy) - np.tile(np.array(character.location), 2)
+                bbox = proxy_aabb[[0, 1, 3, 4]]
+            else:
+                bbox = OccupancyMap.get_footprint(character)
+            mask = lambda points, include_furniture: self.free_mask(points, bbox, include_furniture)
+
+        free = mask(positions, True)
+        if exact_check is None:
+            return free
+        rejected = np.flatnonzero(~free)
+        rejected = rejected[mask(positions[rejected], False)]
+        if len(rejected) == 0:
+            return free
+
+        character_aabb = Utils.get_character_aabb(character, proxy)
+        z_range = character_aabb[[2, 5]] - character.location.z
+        for index in rejected:
+            x, y = positions[index, :2]
+            character_box = np.array([x + bbox[0], y + bbox[1], self.z + z_range[0],
+                                      x + bbox[2], y + bbox[3], self.z + z_range[1]])
+            overlapping = np.all((character_box[:3] <= self.furniture_aabbs[:, 3:]) &
+                                 (character_box[3:] >= self.furniture_aabbs[:, :3]), axis=1)
+            obstacles = [self.furniture[i] for i in np.flatnonzero(overlapping)]
+            free[index] = exact_check((x, y, self.z), obstacles)
+        return free
+
+    def get_free_positions(self, character, grid_spacing, footprint=None, exact_check=None, proxy=None):
+        """Returns all positions on the placement grid of the floor at which the character fits."""
+        x_min, y_min, x_max, y_max = self.bounds
+        grid_x, grid_y = np.meshgrid(np.arange(x_min, x_max, grid_spacing), np.arange(y_min, y_max, grid_spacing))
+        grid_points = np.vstack([grid_x.ravel(), grid_y.ravel()]).T
+        free_points = grid_points[self.placeable_mask(grid_points, character, footprint, exact_check, proxy)]
+        return [(x, y, self.z) for x, y in free_points]
+
+    def stamp_character(self, character):
+        """Marks the current footprint of a placed character as occupied for all following placements."""
+        bpy.context.view_layer.update()
+        location = np.array(character.location)[:2]
+        self._stamp(self.dynamic, OccupancyMap.get_footprint(character) + np.tile(location, 2))
@@ -0,0 +1,114 @@
+import os
+import json
+import shutil
+import hashlib
+
+from InfinigenPopulator.extras.utils import DEFAULT_CACHE_DIR
+from InfinigenPopulator.extras.file_io import sha256_file, write_json_atomic, read_json
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POPULATION_FILES = ("scene.blend", "annotations.json")
+
+
+def get_population_seed(scene_seed, base_seed=0):
+    """Derives the RNG seed of the population of one scene from its seed folder name and a run-wide base seed."""
+    digest = hashlib.sha256(f"{base_seed}:{scene_seed}".encode()).hexdigest()
+    return int(digest[:8], 16)
+
+
+class PopulationCache:
+    """
+    Content-addressed store of populated scenes. An entry holds the scene.blend and annotations.json of one
+    population together with its camera rigs, under a key derived from the sha256 of the input scene, the
+    character files, the population seed, the population options and the source code of this package. Any change
+    to one of them gives a new key, so entries never have to be invalidated.
+    """
+
+    _file_checksums = {}
+    _code_version = None
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = os.path.join(cache_dir or DEFAULT_CACHE_DIR, "populations")
+
+    @staticmethod
+    def get_file_checksum(path):
+        """sha256 of a file, memoized per process on its path, size and modification time."""
+        stat = os.stat(path)
+        signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if signature not in PopulationCache._file_checksums:
+            PopulationCache._file_checksums[signature] = sha256_file(path)
+        return PopulationCache._file_checksums[signature]
+
+    @staticmethod
+    def get_code_version():
+        """sha256 over the Python sources of InfinigenPopulator."""
+        if PopulationCache._code_version is None:
+            sha256 = hashlib.sha256()
+            for root, dirs, names in os.walk(PACKAGE_DIR):
+                dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+                for name in sorted(names):
+                    if name.endswith(".py"):
+                        path = os.path.join(root, name)
+                        sha256.update(os.path.relpath(path, PACKAGE_DIR).encode())
+                        sha256.update(PopulationCache.get_file_checksum(path).encode())
+            PopulationCache._code_version = sha256.hexdigest()
+        return PopulationCache._code_version
+
+    @staticmethod
+    def get_key(input_scene, characters, seed, options=None):
+        key_data = {
+            "input_scene": PopulationCache.get_file_checksum(input_scene),
+            "characters": sorted([os.path.basename(character), PopulationCache.get_file_checksum(character)]
+                                 for character in characters),
+            "seed": seed,
+            "options": options or {},
+            "code_version": PopulationCache.get_code_version()}
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key, scene_dir):
+        """
+        Copies the cached population of key into scene_dir and returns its camera rigs (count, new rig indices), or
+        None on a cache miss. The checksums are verified on the copies, as a put of the same key in another worker
+        may replace the files of the entry at the same time.
+        """
+        entry_dir = self._entry_dir(key)
+        entry = read_json(os.path.join(entry_dir, "entry.json"))
+        if not entry:
+            return None
+        copies = []
+        for file, checksum in entry["files"].items():
+            copy = os.path.join(scene_dir, file)
+            copies.append(copy)
+            try:
+                shutil.copy(os.path.join(entry_dir, file), copy)
+            except FileNotFoundError:
+                pass
+            if not os.path.isfile(copy) or sha256_file(copy) != checksum:
+                print(f"Cached population {os.path.join(entry_dir, file)} is missing or corrupted, populating again.")
+                # A left over annotations.json would be appended to by the new population
+                for path in copies:
+                    if os.path.isfile(path):
+                        os.remove(path)
+                return None
+        return entry["camera_rigs"], entry["new_camera_rigs"]
+
+    def put(self, key, scene_dir, camera_rigs_count, new_rig_ids):
+        """
+        Stores the population in scene_dir under key. Every file replaces its previous version atomically and
+        entry.json is written last, so a concurrent get sees either a complete file or a checksum mismatch.
+        """
+        entry_dir = self._entry_dir(key)
+        os.makedirs(entry_dir, exist_ok=True)
+        checksums = {}
+        for file in POPULATION_FILES:
+            path = os.path.join(scene_dir, file)
+            if os.path.isfile(path):
+                tmp_path = os.path.join(entry_dir, f"{file}.{os.getpid()}.tmp")
+                shutil.copy(path, tmp_path)
+                checksums[file] = sha256_file(tmp_path)
+                os.replace(tmp_path, os.path.join(entry_dir, file))
+        write_json_atomic(os.path.join(entry_dir, "entry.json"),
+                          {"camera_rigs": camera_rigs_count, "new_camera_rigs": new_rig_ids, "files": checksums})
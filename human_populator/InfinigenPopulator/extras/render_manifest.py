@@ -0,0 +1,140 @@
+import os
+import re
+
+from InfinigenPopulator.extras.file_io import sha256_file, write_json_atomic, read_json
+
+POPULATION_MARKER = "population_complete.json"
+
+
+def write_population_marker(scene_dir, camera_rigs_count, new_rig_ids, files=("scene.blend", "annotations.json")):
+    """
+    Marks the population of scene_dir as complete, with the checksums of its outputs, the number of camera rigs and
+    the indices of the rigs added for characters.
+    """
+    checksums = {file: sha256_file(os.path.join(scene_dir, file)) for file in files
+                 if os.path.isfile(os.path.join(scene_dir, file))}
+    write_json_atomic(os.path.join(scene_dir, POPULATION_MARKER),
+                      {"camera_rigs": camera_rigs_count, "new_camera_rigs": new_rig_ids, "files": checksums})
+
+
+def read_population_marker(scene_dir):
+    """
+    Returns the number of camera rigs and the indices of the new rigs of a completely populated scene_dir, or None
+    if the population has to be (re)done because the marker is missing or an output file is missing or changed.
+    """
+    marker = read_json(os.path.join(scene_dir, POPULATION_MARKER))
+    if not marker or "scene.blend" not in marker.get("files", {}) or "camera_rigs" not in marker:
+        return None
+    for file, checksum in marker["files"].items():
+        path = os.path.join(scene_dir, file)
+        if not os.path.isfile(path) or sha256_file(path) != checksum:
+            print(f"Population output {path} is missing or changed!")
+            return None
+    return marker["camera_rigs"], marker["new_camera_rigs"]
+
+
+def clear_population(scene_dir):
+    """Removes the marker and the annotations of an incomplete population, which would otherwise be appended to."""
+    for file in (POPULATION_MARKER, "annotations.json"):
+        path = os.path.join(scene_dir, file)
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+class RenderManifest:
+    """
+    Per-scene record of the finished renders in a render_manifest.json next to frames_folder: for every (camera id,
+    pass) the output files it wrote, with their sha256 checksums. A render counts as done on a rerun only if all its files
+    still exist with the recorded checksums. The files of a render are the ones created or modified in the frames
+    folder while it ran, narrowed down to the ones carrying the camera in their infinigen suffix
+    (_<rig>_<resample>_<frame>_<subcam>). Both passes of a camera rendered in one process therefore share files.
+    """
+
+    def __init__(self, frames_folder):
+        self.frames_folder = frames_folder
+        self.path = RenderManifest.get_path(frames_folder)
+        # infinigen moves every file of the frames folder into frames/<type>/camera_<subcam>/ by its suffix, so the
+        # manifest must not be in there. Move one left by an earlier version out of it.
+        legacy_path = os.path.join(frames_folder, "render_manifest.json")
+        if os.path.isfile(legacy_path):
+            os.replace(legacy_path, self.path)
+        data = read_json(self.path) or {}
+        self.entries = data.get("entries", {})
+        self._verified = set()
+
+    @staticmethod
+    def get_key(camera_id, render_pass):
+        camrig_id, subcam_id = camera_id
+        return f"{camrig_id}_{subcam_id}_{render_pass}"
+
+    @staticmethod
+    def get_path(frames_folder):
+        return os.path.join(os.path.dirname(os.path.normpath(frames_folder)), "render_manifest.json")
+
+    @staticmethod
+    def is_camera_file(file, camera_id):
+        """Whether the file name ends in the infinigen suffix of the camera, like parse_suffix reads it."""
+        camrig_id, subcam_id = camera_id
+        stem = os.path.basename(file).split(".")[0]
+        return re.search(rf"_{camrig_id}_\d+_\d{{4}}_{subcam_id}$", stem) is not None
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_json_atomic(self.path, {"entries": self.entries})
+
+    def clear(self):
+        self.entries = {}
+        self._verified = set()
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def snapshot(self):
+        """Returns {relative path: (size, mtime)} of all files in the frames folder."""
+        files = {}
+        for root, _, names in os.walk(self.frames_folder):
+            for name in names:
+                path = os.path.join(root, name)
+                if name.endswith(".tmp"):
+                    continue
+                stat = os.stat(path)
+                files[os.path.relpath(path, self.frames_folder)] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def is_complete(self, camera_id, render_pass):
+        key = RenderManifest.get_key(camera_id, render_pass)
+        if key in self._verified:
+            return True
+        entry = self.entries.get(key)
+        if not entry or not entry["files"]:
+            return False
+        for file, checksum in entry["files"].items():
+            path = os.path.join(self.frames_folder, file)
+            if not os.path.isfile(path) or sha256_file(path) != checksum:
+                print(f"Render output {path} is missing or changed, rendering {key} again.")
+                return False
+        self._verified.add(key)
+        return True
+
+    def record(self, jobs, before):
+        """Records the (camera id, pass) jobs as done with the files that changed since the snapshot before."""
+        after = self.snapshot()
+        changed = [file for file, signature in after.items() if before.get(file) != signature]
+        checksums = {file: sha256_file(os.path.join(self.frames_folder, file)) for file in changed}
+        for camera_id, render_pass in jobs:
+            key = RenderManifest.get_key(camera_id, render_pass)
+            # Leave out the files of other cameras rendered at the same time, unless the naming is not recognized
+            files = [file for file in changed if RenderManifest.is_camera_file(file, camera_id)] or changed
+            self.entries[key] = {"camera_id": list(camera_id), "pass": render_pass,
+                                 "files": {file: checksums[file] for file in files}}
+            self._verified.add(key)
+        self._save()
+
+    def refresh(self):
+        """
+        Recomputes the checksums once all renders are done, files of concurrent renders may have been recorded
+        while they were still being written.
+        """
+        for entry in self.entries.values():
+            entry["files"] = {file: sha256_file(os.path.join(self.frames_folder, file)) for file in entry["files"]
+                              if os.path.isfile(os.path.join(self.frames_folder, file))}
+        self._save()
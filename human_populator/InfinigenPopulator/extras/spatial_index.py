@@ -0,0 +1,135 @@
+from collections import defaultdict
+
+import bpy
+# noinspection PyUnresolvedReferences
+import numpy as np
+
+
+def get_world_aabbs(objects):
+    """Returns an N x 6 array (min x, y, z, max x, y, z) with the world space bbox of each object."""
+    aabbs = np.zeros((len(objects), 6))
+    for i, obj in enumerate(objects):
+        matrix_world = np.array(obj.matrix_world)
+        corners = np.array(obj.bound_box) @ matrix_world[:3, :3].T + matrix_world[:3, 3]
+        aabbs[i, :3] = corners.min(axis=0)
+        aabbs[i, 3:] = corners.max(axis=0)
+    return aabbs
+
+
+class SpatialIndex:
+    """
+    Uniform 2D grid hash over the scene objects. Every object is hashed into the cells covered by its world bbox
+    and its location, so radius and box queries only look at the objects of a few cells instead of the whole scene.
+    Locations are stored as obj.location to match the checks of the helpers in Utils.
+    """
+    _active = None
+
+    def __init__(self, objects, cell_size=1.0):
+        self.cell_size = cell_size
+        self.objects = []
+        self.locations = np.zeros((0, 3))
+        self.aabbs = np.zeros((0, 6))
+        self.cells = defaultdict(list)
+        self.insert(objects)
+
+    @classmethod
+    def from_scene(cls, scene, cell_size=1.0):
+        return cls(list(scene.objects), cell_size)
+
+    @classmethod
+    def set_active(cls, spatial_index):
+        """Makes spatial_index the one used by the Utils helpers when none is passed explicitly."""
+        cls._active = spatial_index
+
+    @classmethod
+    def get_active(cls):
+        return cls._active
+
+    def insert(self, objects):
+        """Adds objects created after the index was built, e.g. imported characters."""
+        objects = list(objects)
+        if not objects:
+            return
+        first_index = len(self.objects)
+        locations = np.array([tuple(obj.location) for obj in objects])
+        aabbs = get_world_aabbs(objects)
+        self.objects.extend(objects)
+        self.locations = np.vstack([self.locations, locations])
+        self.aabbs = np.vstack([self.aabbs, aabbs])
+
+        xy_min = np.floor(np.minimum(aabbs[:, :2], locations[:, :2]) / self.cell_size).astype(int)
+        xy_max = np.floor(np.maximum(aabbs[:, 3:5], locations[:, :2]) / self.cell_size).astype(int)
+        for offset, (cell_min, cell_max) in enumerate(zip(xy_min, xy_max)):
+            for i in range(cell_min[0], cell_max[0] + 1):
+                for j in range(cell_min[1], cell_max[1] + 1):
+                    self.cells[(i, j)].append(first_index + offset)
+
+    def _candidates(self, xy_min, xy_max):
+        if not self.objects:
+            return np.zeros(0, dtype=int)
+        # Unbounded queries would enumerate an infinite number of cells, clip them to the indexed extent
+        xy_min = np.maximum(xy_min, np.minimum(self.aabbs[:, :2].min(axis=0), self.locations[:, :2].min(axis=0)))
+        xy_max = np.minimum(xy_max, np.maximum(self.aabbs[:, 3:5].max(axis=0), self.locations[:, :2].max(axis=0)))
+        if np.any(xy_min > xy_max):
+            return np.zeros(0, dtype=int)
+        cell_min = np.floor(xy_min / self.cell_size).astype(int)
+        cell_max = np.floor(xy_max / self.cell_size).astype(int)
+        candidates = set()
+        for i in range(cell_min[0], cell_max[0] + 1):
+            for j in range(cell_min[1], cell_max[1] + 1):
+                candidates.update(self.cells.get((i, j), ()))
+        return np.array(sorted(candidates), dtype=int)
+
+    def _resolve(self, indices):
+        objects = []
+        for i in indices:
+            obj = self.objects[i]
+            try:
+                obj.name
+            except ReferenceError:  # Removed from the file since indexing, e.g. joined character meshes
+                continue
+            objects.append(obj)
+        return objects
+
+    def query_box(self, box_min, box_max):
+        """Returns all objects whose location lies inside the (inclusive) world box."""
+        box_min, box_max = np.asarray(box_min, dtype=float), np.asarray(box_max, dtype=float)
+        candidates = self._candidates(box_min[:2], box_max[:2])
+        locations = self.locations[candidates]
+        inside = np.all((locations >= box_min) & (locations <= box_max), axis=1)
+        return self._resolve(candidates[inside])
+
+    def query_radius(self, center, radius):
+        """Returns all objects whose location is closer than radius to center, nearest first."""
+        center = np.asarray(center, dtype=float)
+        candidates = self._candidates(center[:2] - radius, center[:2] + radius)
+        distances = np.linalg.norm(self.locations[candidates] - center, axis=1)
+        order = np.argsort(distances)
+        return self._resolve(candidates[order][distances[order] < radius])
+
+    def query_local_box(self, matrix_world, local_min, local_max):
+        """
+        Returns all objects whose location, expressed in the space of matrix_world, lies inside the local box.
+        Bounds may be infinite, e.g. to query a slab next to an object.
+        """
+        if not self.objects:
+            return []
+        matrix_world = np.array(matrix_world)
+        inverse = np.linalg.inv(matrix_world)
+        local_min, local_max = np.asarray(local_min, dtype=float), np.asarray(local_max, dtype=float)
+        # Every indexed location lies in the local bbox of the corners of their world extent. Clipping infinite
+        # bounds to it keeps the box finite, so the grid filters the candidates.
+        extent = np.array([self.locations.min(axis=0), self.locations.max(axis=0)])
+        extent_corners = np.array([[x, y, z] for x in extent[:, 0] for y in extent[:, 1] for z in extent[:, 2]])
+        local_extent = extent_corners @ inverse[:3, :3].T + inverse[:3, 3]
+        clipped_min = np.maximum(local_min, local_extent.min(axis=0))
+        clipped_max = np.minimum(local_max, local_extent.max(axis=0))
+        if np.any(clipped_min > clipped_max):
+            return []
+        corners = np.array([[x, y, z] for x in (clipped_min[0], clipped_max[0])
+                            for y in (clipped_min[1], clipped_max[1]) for z in (clipped_min[2], clipped_max[2])])
+        world_corners = corners @ matrix_world[:3, :3].T + matrix_world[:3, 3]
+        candidates = self._candidates(world_corners[:, :2].min(axis=0), world_corners[:, :2].max(axis=0))
+        local_locations = self.locations[candidates] @ inverse[:3, :3].T + inverse[:3, 3]
+        inside = np.all((local_locations >= local_min) & (local_locations <= local_max), axis=1)
+        return self._resolve(candidates[inside])
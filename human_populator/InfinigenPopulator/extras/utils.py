@@ -7,23 +7,133 @@ import bmesh
 import numpy as np
 # noinspection PyUnresolvedReferences
 from mathutils import Vector
-from scipy.spatial import ConvexHull
+from scipy.spatial import ConvexHull, HalfspaceIntersection
 import matplotlib.pyplot as plt
 from matplotlib.path import Path
 from shapely.geometry import Polygon, Point
+from shapely.prepared import prep
+try:
+    from shapely import contains_xy
+except ImportError:  # shapely < 2.0 has no vectorized predicates
+    contains_xy = None
+
+from InfinigenPopulator.extras.spatial_index import SpatialIndex, get_world_aabbs
+from InfinigenPopulator.extras.mesh_arrays import (get_vertex_coordinates, get_world_vertices,
+                                                   get_polygon_vertex_indices, transform_points)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "hoiverse")
+# human_populator/assets, independent of the working directory
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "assets")
+# Face normals of the 18-DOP collision proxy: the axes and the diagonals of the axis planes, in both directions
+PROXY_DIRECTIONS = np.vstack([np.eye(3), np.array([[1, 1, 0], [1, -1, 0], [1, 0, 1], [1, 0, -1], [0, 1, 1],
+                                                   [0, 1, -1]]) / 2 ** 0.5])
+PROXY_DIRECTIONS = np.vstack([PROXY_DIRECTIONS, -PROXY_DIRECTIONS])
 
 class Utils:
     @staticmethod
-    def get_valid_ground_positions(character, floor_name, grid_spacing):
+    def get_valid_ground_positions(character, floor_name, grid_spacing, footprint=None, exact_check=None, proxy=None):
         #TOOD statt floor mit ceiling ausprobieren und dann schauen
         floor = bpy.data.objects.get(floor_name)
         if not floor:
             raise ValueError(f"Floor '{floor_name}' not found!")
 
-        floor_verts = [floor.matrix_world @ v.co for v in floor.data.vertices]
-        points_2d_verts = np.array([[v.x, v.y] for v in floor_verts])
-        z = min(v.z for v in floor_verts)
-        floor_polygon = Polygon(points_2d_verts)
+        floor_verts, z, floor_polygon, grid_points = Utils.get_floor_grid(floor, grid_spacing)
+        filtered_points = grid_points[Utils.points_in_polygon(floor_polygon, grid_points)]
+
+        candidate_positions = [(x, y, z) for x, y in filtered_points]
+
+        floor_objects = Utils.get_objects_on_floor(floor_verts, floor_name, 0.6)
+        obstacle_aabbs = Utils.get_world_aabbs(floor_objects)
+        placeable = Utils.filter_placeable_positions(character, obstacle_aabbs, candidate_positions, floor_name,
+                                                     footprint, floor_objects, exact_check, proxy)
+        valid_positions = [position for position, is_placeable in zip(candidate_positions, placeable) if is_placeable]
+
+        return valid_positions
+
+    @staticmethod
+    def sample_valid_ground_positions(character, floor_name, min_distance, max_positions=None, occupancy_map=None,
+                                      footprint=None, exact_check=None, proxy=None):
+        """
+        Generator counterpart of get_valid_ground_positions. Candidates are drawn lazily in Poisson-disk order and
+        only the collision-free ones are yielded, stopping after max_positions. The work therefore depends on how
+        many positions are needed rather than on the floor size.
+        """
+        floor = bpy.data.objects.get(floor_name)
+        if not floor:
+            raise ValueError(f"Floor '{floor_name}' not found!")
+        floor_verts, z, floor_polygon = Utils.get_floor_polygon(floor)
+
+        if occupancy_map is not None:
+            is_valid = lambda position: occupancy_map.placeable_mask([position], character, footprint, exact_check,
+                                                                     proxy)[0]
+        else:
+            floor_objects = Utils.get_objects_on_floor(floor_verts, floor_name, 0.6)
+            obstacle_aabbs = Utils.get_world_aabbs(floor_objects)
+            is_valid = lambda position: Utils.filter_placeable_positions(
+                character, obstacle_aabbs, [position], floor_name, footprint, floor_objects, exact_check, proxy)[0]
+
+        accepted = 0
+        for x, y in Utils.poisson_disk_points(floor_polygon, min_distance):
+            position = (x, y, z)
+            if is_valid(position):
+                yield position
+                accepted += 1
+                if max_positions is not None and accepted >= max_positions:
+                    return
+
+    @staticmethod
+    def poisson_disk_points(polygon, min_distance, attempts=30):
+        """
+        Lazily yields 2D points inside the polygon in random order, no two closer than min_distance (Bridson's
+        algorithm). Points are produced one at a time, so stopping early skips the rest of the floor.
+        """
+        x_min, y_min, x_max, y_max = polygon.bounds
+        cell_size = min_distance / np.sqrt(2)
+        samples = {}
+        active = []
+
+        def fits(point):
+            if not Utils.points_in_polygon(polygon, point)[0]:
+                return False
+            i, j = np.floor((point - (x_min, y_min)) / cell_size).astype(int)
+            for di in range(-2, 3):
+                for dj in range(-2, 3):
+                    neighbour = samples.get((i + di, j + dj))
+                    if neighbour is not None and np.linalg.norm(neighbour - point) < min_distance:
+                        return False
+            return True
+
+        def add(point):
+            samples[tuple(np.floor((point - (x_min, y_min)) / cell_size).astype(int))] = point
+            active.append(point)
+
+        for _ in range(attempts * 10):
+            point = np.random.uniform((x_min, y_min), (x_max, y_max))
+            if fits(point):
+                add(point)
+                yield point
+                break
+
+        while active:
+            index = np.random.randint(len(active))
+            origin = active[index]
+            for _ in range(attempts):
+                radius = np.random.uniform(min_distance, 2 * min_distance)
+                angle = np.random.uniform(0, 2 * np.pi)
+                point = origin + radius * np.array([np.cos(angle), np.sin(angle)])
+                if fits(point):
+                    add(point)
+                    yield point
+                    break
+            else:
+                active[index] = active[-1]
+                active.pop()
+
+    @staticmethod
+    def get_floor_grid(floor, grid_spacing):
+        """Returns the world floor vertices, floor height, 2D floor polygon and the regular grid over its bbox."""
+        floor_verts, z, floor_polygon = Utils.get_floor_polygon(floor)
+        points_2d_verts = np.array(floor_polygon.exterior.coords)
 
         x_min, x_max = np.min(points_2d_verts[:, 0]), np.max(points_2d_verts[:, 0])
         y_min, y_max = np.min(points_2d_verts[:, 1]), np.max(points_2d_verts[:, 1])
@@ -32,27 +142,33 @@ class Utils:
         y_vals = np.arange(y_min, y_max, grid_spacing)
         grid_x, grid_y = np.meshgrid(x_vals, y_vals)
         grid_points = np.vstack([grid_x.ravel(), grid_y.ravel()]).T
+        return floor_verts, z, floor_polygon, grid_points
 
-        filtered_points = np.array([
-            [x, y] for x, y in grid_points if floor_polygon.contains(Point(x, y))
-        ])
-
-        candidate_positions = [(x, y, z) for x, y in filtered_points]
-
-        floor_objects = Utils.get_objects_on_floor(floor_verts, floor_name, 0.6)
-        valid_positions = []
-        for position in candidate_positions:
-            if Utils.can_place_character(character, floor_objects, position, floor_name):
-                valid_positions.append(position)
+    @staticmethod
+    def get_floor_polygon(floor):
+        """Returns the world floor vertices (N x 3), floor height and 2D floor polygon."""
+        floor_verts = get_world_vertices(floor)
+        return floor_verts, floor_verts[:, 2].min(), Polygon(floor_verts[:, :2])
 
-        return valid_positions
+    @staticmethod
+    def points_in_polygon(polygon, points):
+        """
+        Returns a boolean mask of the 2D points lying inside the polygon. The whole array is tested in one
+        vectorized call (shapely >= 2.0) or against a prepared geometry, with the same result as Polygon.contains.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if contains_xy is not None:
+            return np.asarray(contains_xy(polygon, points[:, 0], points[:, 1]), dtype=bool)
+        prepared_polygon = prep(polygon)
+        return np.fromiter((prepared_polygon.contains(Point(x, y)) for x, y in points), dtype=bool,
+                           count=len(points))
 
     @staticmethod
-    def can_place_character(character, floor_objects, position, floor_name):
-        character_bbox_min, character_bbox_max = Utils.get_bounding_box_in_world(character, position)
+    def can_place_character(character, floor_objects, position, floor_name, proxy=None):
+        character_bbox_min, character_bbox_max = Utils.get_bounding_box_in_world(character, position, proxy)
         for obj in floor_objects:
             obj_min, obj_max = Utils.get_bounding_box_in_world(obj)
-            is_within = Utils.check_object_within_floor_at_position(character, floor_name, position)
+            is_within = Utils.check_object_within_floor_at_position(character, floor_name, position, proxy)
             is_overlapping = Utils.is_overlapping(character_bbox_min, character_bbox_max, obj_min, obj_max)
             if is_overlapping:
                 return False
@@ -61,8 +177,146 @@ class Utils:
         return True
 
     @staticmethod
-    def get_bounding_box_in_world(obj, location=None):
-        bbox = [obj.matrix_world @ Vector(corner) for corner in obj.bound_box]
+    def filter_placeable_positions(character, obstacle_aabbs, positions, floor_name, footprint=None, obstacles=None,
+                                   exact_check=None, proxy=None):
+        """
+        Vectorized can_place_character for many candidate positions at once. The character bbox is translated to
+        every position and tested against the N x 6 obstacle array from get_world_aabbs in one broadcast.
+        If a 2D footprint polygon relative to the character location is given (e.g. rotated for the placement
+        angle), its bounds replace the x/y extent of the character bbox. With exact_check, positions on the floor
+        that only fail the bbox test are decided by exact_check(position, overlapping obstacles). With a collision
+        proxy (see get_convex_proxy), the character bbox is the one of the proxy instead of the armature.
+        Returns a boolean mask over positions.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        if len(obstacle_aabbs) == 0:
+            # can_place_character only checks inside its per-obstacle loop, so no obstacles means every position passes
+            return np.ones(len(positions), dtype=bool)
+
+        character_aabb = Utils.get_character_aabb(character, proxy)
+        if footprint is not None:
+            character_aabb[[0, 1, 3, 4]] = np.concatenate([footprint.min(axis=0), footprint.max(axis=0)])
+            character_aabb[[0, 1, 3, 4]] += np.tile(np.array(character.location)[:2], 2)
+        offsets = positions - np.array(character.location)
+        character_min = (character_aabb[:3] + offsets)[:, None, :]
+        character_max = (character_aabb[3:] + offsets)[:, None, :]
+        overlaps = np.all((character_min <= obstacle_aabbs[None, :, 3:]) &
+                          (character_max >= obstacle_aabbs[None, :, :3]), axis=2)
+        overlapping = overlaps.any(axis=1)
+
+        # Same convention as check_object_within_floor_at_position: the world bbox is shifted by the position
+        floor_aabb = Utils.get_world_aabbs([bpy.data.objects.get(floor_name)])[0]
+        footprint_min = character_aabb[:2] + positions[:, :2]
+        footprint_max = character_aabb[3:5] + positions[:, :2]
+        within = (np.all(footprint_min >= floor_aabb[:2], axis=1) &
+                  np.all(footprint_max <= floor_aabb[3:5], axis=1))
+        placeable = within & ~overlapping
+        if exact_check is not None and obstacles is not None:
+            for index in np.flatnonzero(within & overlapping):
+                overlapping_obstacles = [obstacles[i] for i in np.flatnonzero(overlaps[index])]
+                placeable[index] = exact_check(tuple(positions[index]), overlapping_obstacles)
+        return placeable
+
+    @staticmethod
+    def get_posed_geometry(character, with_polygons=False):
+        """
+        Returns the vertices (N x 3, relative to the character location) of the evaluated, i.e. posed, meshes below
+        the character and, if requested, their polygons as vertex index lists.
+        """
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        vertices = []
+        polygons = []
+        vertex_count = 0
+        for obj in [character] + list(character.children_recursive):
+            if obj.type != "MESH":
+                continue
+            evaluated_obj = obj.evaluated_get(depsgraph)
+            mesh = evaluated_obj.to_mesh()
+            vertices.append(transform_points(get_vertex_coordinates(mesh), evaluated_obj.matrix_world))
+            if with_polygons:
+                polygons.extend([vertex_count + i for i in polygon] for polygon in get_polygon_vertex_indices(mesh))
+            vertex_count += len(mesh.vertices)
+            evaluated_obj.to_mesh_clear()
+        vertices = np.vstack(vertices) - np.array(character.location) if vertices else np.zeros((0, 3))
+        return (vertices, polygons) if with_polygons else vertices
+
+    @staticmethod
+    def get_footprint_hull(character):
+        """Returns the 2D convex hull (K x 2, counter-clockwise) of the posed character relative to its location."""
+        points_2d = Utils.get_posed_geometry(character)[:, :2]
+        if len(points_2d) == 0:
+            aabb = Utils.get_world_aabbs([character])[0]
+            points_2d = np.array([[x, y] for x in (aabb[0], aabb[3]) for y in (aabb[1], aabb[4])])
+            points_2d -= np.array(character.location)[:2]
+        hull = ConvexHull(points_2d)
+        return points_2d[hull.vertices]
+
+    @staticmethod
+    def get_convex_proxy(character):
+        """
+        Returns a low-poly convex collision proxy of the posed character as vertices (K x 3, relative to the
+        character location) and triangles (M x 3 vertex indices): the 18-DOP of the posed vertices, i.e. the
+        intersection of the 18 halfspaces with the normals PROXY_DIRECTIONS that touch the farthest posed vertex.
+        As a convex polytope with 18 faces it has at most 32 corners and 60 triangles. It contains every posed
+        vertex and its bbox is the one of the mesh. Building it costs one product of the vertices with 18 directions.
+        """
+        vertices = Utils.get_posed_geometry(character)
+        if len(vertices) == 0:
+            aabb = Utils.get_world_aabbs([character])[0] - np.tile(np.array(character.location), 2)
+            vertices = np.array([[x, y, z] for x in aabb[[0, 3]] for y in aabb[[1, 4]] for z in aabb[[2, 5]]])
+        # Halfspaces as n.x + d <= 0 inside, with 10 micrometers of slack for merging corners that coincide up to
+        # rounding
+        halfspaces = np.hstack([PROXY_DIRECTIONS, -(vertices @ PROXY_DIRECTIONS.T).max(axis=0)[:, None] - 1e-5])
+        try:
+            corners = HalfspaceIntersection(halfspaces, vertices.mean(axis=0)).intersections
+            support = np.unique(corners.round(6), axis=0)
+            hull = ConvexHull(support)
+        except Exception:
+            # Flat posed vertices, fall back to their bbox
+            support = np.array([[x, y, z] for x in (vertices[:, 0].min(), vertices[:, 0].max())
+                                for y in (vertices[:, 1].min(), vertices[:, 1].max())
+                                for z in (vertices[:, 2].min(), vertices[:, 2].max())])
+            hull = ConvexHull(support, qhull_options="QJ")
+        used = np.unique(hull.simplices)
+        remap = np.full(len(support), -1)
+        remap[used] = np.arange(len(used))
+        return support[used], remap[hull.simplices]
+
+    @staticmethod
+    def rotate_proxy(proxy, degrees):
+        """Rotates a collision proxy like rotate_footprint."""
+        vertices, triangles = proxy
+        vertices = np.array(vertices, dtype=float)
+        vertices[:, :2] = Utils.rotate_footprint(vertices[:, :2], degrees)
+        return vertices, triangles
+
+    @staticmethod
+    def get_character_aabb(character, proxy=None):
+        """World bbox (min x, y, z, max x, y, z) of the character, from its collision proxy if one is given."""
+        if proxy is None:
+            return Utils.get_world_aabbs([character])[0]
+        vertices = np.asarray(proxy[0]) + np.array(character.location)
+        return np.concatenate([vertices.min(axis=0), vertices.max(axis=0)])
+
+    @staticmethod
+    def rotate_footprint(footprint, degrees):
+        """Rotates a 2D footprint counter-clockwise around the character location, like rotate_character."""
+        angle = np.radians(degrees)
+        rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+        return np.asarray(footprint) @ rotation.T
+
+    @staticmethod
+    def get_world_aabbs(objects):
+        """Returns an N x 6 array (min x, y, z, max x, y, z) with the world space bbox of each object."""
+        return get_world_aabbs(objects)
+
+    @staticmethod
+    def get_bounding_box_in_world(obj, location=None, proxy=None):
+        if proxy is not None:
+            aabb = Utils.get_character_aabb(obj, proxy)
+            bbox = [Vector(aabb[:3]), Vector(aabb[3:])]
+        else:
+            bbox = [obj.matrix_world @ Vector(corner) for corner in obj.bound_box]
         if location:
             offset = Vector(location) - obj.location
             bbox = [corner + offset for corner in bbox]
@@ -77,16 +331,19 @@ class Utils:
                 min1.z <= max2.z and max1.z >= min2.z)
 
     @staticmethod
-    def get_objects_on_floor(floor_corners, floor_name, floor_height_wiggle_room):
-        x_min = min(corner.x for corner in floor_corners)
-        x_max = max(corner.x for corner in floor_corners)
-        y_min = min(corner.y for corner in floor_corners)
-        y_max = max(corner.y for corner in floor_corners)
-        z = min(corner.z for corner in floor_corners)
+    def get_objects_on_floor(floor_corners, floor_name, floor_height_wiggle_room, spatial_index=None):
+        floor_corners = np.array(floor_corners, dtype=float).reshape(-1, 3)
+        x_min, y_min, z = floor_corners.min(axis=0)
+        x_max, y_max, _ = floor_corners.max(axis=0)
         z_min = z - floor_height_wiggle_room
         z_max = z + floor_height_wiggle_room
+        spatial_index = spatial_index or SpatialIndex.get_active()
+        if spatial_index is not None:
+            examined_objects = spatial_index.query_box((x_min, y_min, z_min), (x_max, y_max, z_max))
+        else:
+            examined_objects = bpy.context.scene.objects
         floor_objects = []
-        for obj in bpy.context.scene.objects:
+        for obj in examined_objects:
             if obj.name == floor_name:
                 continue
             if (x_min <= obj.location.x <= x_max) and (y_min <= obj.location.y <= y_max) and (
@@ -95,7 +352,7 @@ class Utils:
         return floor_objects
 
     @staticmethod
-    def check_object_within_floor_at_position(character, floor_name, position):
+    def check_object_within_floor_at_position(character, floor_name, position, proxy=None):
         floor = bpy.data.objects.get(floor_name)
 
         floor_corners = [floor.matrix_world @ Vector(corner) for corner in floor.bound_box]
@@ -104,7 +361,11 @@ class Utils:
         floor_y_min = min(corner.y for corner in floor_corners)
         floor_y_max = max(corner.y for corner in floor_corners)
 
-        character_corners = [character.matrix_world @ Vector(corner) for corner in character.bound_box]
+        if proxy is not None:
+            character_aabb = Utils.get_character_aabb(character, proxy)
+            character_corners = [Vector(character_aabb[:3]), Vector(character_aabb[3:])]
+        else:
+            character_corners = [character.matrix_world @ Vector(corner) for corner in character.bound_box]
         obj_min_x = min(corner.x for corner in character_corners)
         obj_max_x = max(corner.x for corner in character_corners)
         obj_min_y = min(corner.y for corner in character_corners)
@@ -123,7 +384,7 @@ class Utils:
         return is_within
 
     @staticmethod
-    def check_available_space_y(factory_obj, threshold = 0.3):
+    def check_available_space_y(factory_obj, threshold = 0.3, spatial_index=None):
         if not factory_obj:
             print("Object not found.")
         else:
@@ -132,7 +393,13 @@ class Utils:
 
             inv_matrix = factory_obj.matrix_world.inverted()
 
-            for obj in bpy.data.objects:
+            spatial_index = spatial_index or SpatialIndex.get_active()
+            if spatial_index is not None:
+                examined_objects = spatial_index.query_local_box(
+                    factory_obj.matrix_world, (-threshold, -np.inf, -np.inf), (threshold, np.inf, np.inf))
+            else:
+                examined_objects = bpy.data.objects
+            for obj in examined_objects:
 
                 if obj == factory_obj:
                     continue
@@ -158,13 +425,17 @@ class Utils:
                 return False
 
     @staticmethod
-    def is_space_free(candidate_position, character, floor_name, clearance=0.4):
+    def is_space_free(candidate_position, character, floor_name, clearance=0.4, spatial_index=None, proxy=None):
         """
         Checks if the candidate position is free by comparing the distance to all examined objects. Returns a tuple (bool, colliding_obj_name).
         """
-        if not Utils.check_object_within_floor_at_position(character, floor_name, candidate_position):
+        if not Utils.check_object_within_floor_at_position(character, floor_name, candidate_position, proxy):
             return False, "outside floor"
-        examined_objects = [obj for obj in bpy.data.objects if obj.type != "CAMERA" or obj.type != "ARMATURE"]
+        spatial_index = spatial_index or SpatialIndex.get_active()
+        if spatial_index is not None:
+            examined_objects = spatial_index.query_radius(candidate_position, clearance)
+        else:
+            examined_objects = [obj for obj in bpy.data.objects if obj.type != "CAMERA" or obj.type != "ARMATURE"]
         for obj in examined_objects:
 
             distance = (candidate_position - obj.location).length
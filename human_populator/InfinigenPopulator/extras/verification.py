@@ -25,7 +25,8 @@ def verify_characters(path):
         for file in os.listdir(path)
         if file.lower().endswith('.fbx') and os.path.isfile(os.path.join(path, file))
     ]"""
-    return characters
+    # listdir order depends on the file system, a seeded population needs the same order on every machine
+    return sorted(characters)
 
 
 def verify_output_root(path):
@@ -0,0 +1,155 @@
+import os
+import shutil
+import time
+import traceback
+
+from InfinigenPopulator.logic.blender_logic import process_scene, reset_session, select_cameras, get_camera_rig_ids
+from InfinigenPopulator.logic.render_logic import render_scene, get_frames_folder, RENDER_PROFILES
+from InfinigenPopulator.extras.verification import verify_scene
+from InfinigenPopulator.extras.render_manifest import (RenderManifest, read_population_marker,
+                                                       write_population_marker, clear_population)
+from InfinigenPopulator.extras.population_cache import PopulationCache, get_population_seed
+from InfinigenPopulator.extras.file_io import write_json_atomic
+
+
+def get_seed(input_path):
+    return os.path.basename(os.path.normpath(input_path))
+
+
+def collect_scene_folders(path):
+    """
+    Returns the seed folders to process. path is either a root folder whose subfolders are seed folders or a
+    manifest file with one seed folder per line (relative to the manifest, '#' starts a comment).
+    """
+    if os.path.isfile(path):
+        manifest_dir = os.path.dirname(os.path.abspath(path))
+        with open(path, 'r') as manifest_file:
+            lines = [line.split("#")[0].strip() for line in manifest_file]
+        return [os.path.join(manifest_dir, os.path.expanduser(line)) for line in lines if line]
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Path does not exist: {path}")
+    return sorted(os.path.join(path, item) for item in os.listdir(path)
+                  if os.path.isdir(os.path.join(path, item, "fine")))
+
+
+def prepare_scene(input_path, output_root, characters, exact_collisions=False, camera_selection="all",
+                  population_options=None):
+    """
+    Populates one seed folder into output_root/<seed>/fine, unless a previous population completed. The population
+    is seeded from the seed folder name and population_options["seed"], and taken from the PopulationCache when
+    the same inputs were populated before (population_options["cache"], default on). Returns the populated scene
+    as a dict with the seed, the output_dir of the seed, its scene_dir and the camera_ids to render according to
+    camera_selection (see select_cameras).
+    """
+    # Render subprocesses run from the infinigen checkout, so all paths handed to them must be absolute
+    input_path, output_root = os.path.abspath(input_path), os.path.abspath(output_root)
+    input_scene = verify_scene(input_path)
+    seed = get_seed(input_path)
+    print("Scene Seed: ", seed)
+
+    output_scene_dir = os.path.join(output_root, seed)
+    scene_dir = os.path.join(output_scene_dir, "fine")
+    os.makedirs(scene_dir, exist_ok=True)
+    output_scene = os.path.join(scene_dir, "scene.blend")
+
+    population_options = population_options or {}
+    population_seed = get_population_seed(seed, population_options.get("seed", 0))
+    camera_rigs = read_population_marker(scene_dir)
+    if camera_rigs is not None:
+        print("\n=== Scene already populated, skipping Blender processing ===")
+    else:
+        clear_population(scene_dir)
+        # Renders of an earlier population do not belong to the new one, whatever profile they were made with
+        for profile in RENDER_PROFILES:
+            RenderManifest(get_frames_folder(output_scene_dir, profile)).clear()
+        shutil.copy(os.path.join(os.path.dirname(input_scene), "MaskTag.json"), scene_dir)
+        cache, cache_key = None, None
+        if population_options.get("cache", True):
+            cache = PopulationCache(population_options.get("cache_dir"))
+            cache_key = PopulationCache.get_key(input_scene, characters, population_seed,
+                                                {"exact_collisions": exact_collisions})
+            camera_rigs = cache.get(cache_key, scene_dir)
+        if camera_rigs is not None:
+            print(f"\n=== Reusing cached population {cache_key}, skipping Blender processing ===")
+        else:
+            print(f"\n=== Processing scene in Blender (population seed {population_seed}) ===")
+            # process_scene consumes the list it is given
+            process_scene(input_scene, output_scene, list(characters), exact_collisions, camera_selection,
+                          population_seed)
+            camera_rigs = get_camera_rig_ids()
+            if cache:
+                cache.put(cache_key, scene_dir, *camera_rigs)
+        write_population_marker(scene_dir, *camera_rigs)
+    camera_id_list = select_cameras(*camera_rigs, camera_selection)
+    print("Cameras to render: ", len(camera_id_list))
+    return {"seed": seed, "output_dir": output_scene_dir, "scene_dir": scene_dir, "camera_ids": camera_id_list}
+
+
+def render_prepared_scene(scene, infinigen_path, render_mode="legacy", render_options=None):
+    """
+    Renders the cameras of a scene returned by prepare_scene that are missing from its render manifest. Each render
+    profile of render_options has its own frames folder and manifest. Returns the render time in seconds.
+    """
+    render_options = dict(render_options or {})
+    profile = render_options.get("profile", "production")
+    render_dir = get_frames_folder(scene["output_dir"], profile)
+    os.makedirs(render_dir, exist_ok=True)
+    print(f"\n=== Running infinigen for {scene['seed']} into {render_dir} ===")
+    start = time.perf_counter()
+    render_scene(scene["scene_dir"], render_dir, scene["seed"], scene["camera_ids"], cwd=infinigen_path,
+                 mode=render_mode, manifest=RenderManifest(render_dir), **render_options)
+    render_time = time.perf_counter() - start
+    print(f"Rendered {len(scene['camera_ids'])} cameras of {scene['seed']} with the {profile} profile in "
+          f"{render_time:.1f} s")
+    return render_time
+
+
+def populate_scene(input_path, output_root, characters, infinigen_path, exact_collisions=False, render_mode="legacy",
+                   render_options=None, camera_selection="all", population_options=None):
+    """
+    Populates and renders one seed folder into output_root/<seed>. population_options are passed on to
+    prepare_scene, render_options to render_scene.
+    A rerun skips the population if it completed before and only renders the cameras and passes that are missing.
+    Returns the number of rendered cameras.
+    """
+    scene = prepare_scene(input_path, output_root, characters, exact_collisions, camera_selection,
+                          population_options)
+    render_prepared_scene(scene, infinigen_path, render_mode, render_options)
+    return len(scene["camera_ids"])
+
+
+def populate_batch(scenes_path, output_root, characters, infinigen_path, exact_collisions=False,
+                   render_mode="legacy", render_options=None, camera_selection="all", population_options=None):
+    """
+    Populates and renders all seed folders of scenes_path (root folder or manifest) in this Blender session.
+    A failing scene is recorded and skipped. The per-scene results are written to output_root/batch_summary.json
+    after every scene. Returns the summary.
+    """
+    scene_folders = [os.path.abspath(folder) for folder in collect_scene_folders(scenes_path)]
+    summary_path = os.path.join(os.path.abspath(output_root), "batch_summary.json")
+    summary = {"scenes_path": os.path.abspath(scenes_path), "succeeded": 0, "failed": 0, "scenes": []}
+    print(f"Found {len(scene_folders)} scenes to process.")
+
+    for i, input_path in enumerate(scene_folders):
+        print(f"\n=== Scene {i + 1} / {len(scene_folders)}: {input_path} ===")
+        start = time.perf_counter()
+        result = {"seed": get_seed(input_path), "input_folder": input_path}
+        try:
+            result["cameras"] = populate_scene(input_path, output_root, characters, infinigen_path,
+                                               exact_collisions, render_mode, render_options, camera_selection,
+                                               population_options)
+            result["status"] = "success"
+            summary["succeeded"] += 1
+        except Exception as e:
+            traceback.print_exc()
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+            summary["failed"] += 1
+        finally:
+            reset_session()
+        result["duration"] = round(time.perf_counter() - start, 2)
+        summary["scenes"].append(result)
+        write_json_atomic(summary_path, summary)
+
+    print(f"Batch done: {summary['succeeded']} succeeded, {summary['failed']} failed. Summary: {summary_path}")
+    return summary
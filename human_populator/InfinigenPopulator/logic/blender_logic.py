@@ -1,34 +1,103 @@
 import os
+import json
+import time
+import random
+import bpy
 import numpy as np
 
 from InfinigenPopulator.managers.pose_manager import PoseManager
 from InfinigenPopulator.managers.scene_manager import SceneManager
 from InfinigenPopulator.managers.character_manager import CharacterManager
+from InfinigenPopulator.managers.scene_analysis import SceneAnalysis
 from InfinigenPopulator.managers.annotation_manager import AnnotationManager
+from InfinigenPopulator.managers.item_manager import ItemManager
+from InfinigenPopulator.extras.occupancy_map import OccupancyMap
+from InfinigenPopulator.extras.footprint_cache import FootprintCache
+from InfinigenPopulator.extras.character_library import CharacterLibrary
+from InfinigenPopulator.extras.character_index import CharacterIndex, get_characters_root
+from InfinigenPopulator.extras.collision import CollisionChecker
+from InfinigenPopulator.extras.spatial_index import SpatialIndex
+from InfinigenPopulator.extras.category_index import CategoryIndex
 import infinigen.core.placement.camera as cam_util
 
+CAMERA_SELECTIONS = ("all", "new")
+NEW_CAMERA_RIGS_PROPERTY = "populator_new_camera_rigs"
 
-def find_character_by_keyword(characters, keyword):
+
+def has_keyword(character, keyword, character_index=None):
+    """Whether the character matches the keyword, from its record in the character index if it has one."""
+    matches = character_index.has_keyword(character, keyword) if character_index else None
+    return keyword in character if matches is None else matches
+
+
+def find_character_by_keyword(characters, keyword, character_index=None):
     """Returns character and updated list after removal based on keyword."""
     for i, char in enumerate(characters):
-        if keyword in char:
+        if has_keyword(char, keyword, character_index):
             return characters.pop(i)
     return None
 
 
-def process_scene(scene_path: str, save_path: str, characters: list[str]):
+def select_cameras(camera_rigs_count, new_rig_ids, selection="all"):
+    """
+    Returns the camera ids to render: of all camera rigs, of the rigs added for characters ("new") or of the listed
+    rig indices.
+    """
+    if selection == "all":
+        rig_ids = range(camera_rigs_count)
+    elif selection == "new":
+        rig_ids = new_rig_ids
+    elif isinstance(selection, str):
+        raise ValueError(f"Unknown camera selection '{selection}'! Must be one of {CAMERA_SELECTIONS} or a list.")
+    else:
+        invalid_ids = [i for i in selection if not 0 <= i < camera_rigs_count]
+        if invalid_ids:
+            raise ValueError(f"Camera rigs {invalid_ids} do not exist, the scene has {camera_rigs_count} rigs!")
+        rig_ids = selection
+    return [[i, 0] for i in rig_ids]
+
+
+def get_camera_rig_ids():
+    """Returns the number of camera rigs of the loaded scene and the indices of the rigs added during population."""
+    new_rig_ids = json.loads(bpy.data.scenes[0].get(NEW_CAMERA_RIGS_PROPERTY, "[]"))
+    return len(cam_util.get_camera_rigs()), new_rig_ids
+
+
+def reset_session():
+    """Drops all state of the previous scene so the next one can be processed in the same Blender session."""
+    SpatialIndex.set_active(None)
+    CategoryIndex.set_active(None)
+    SceneAnalysis.set_shared(None)
+    ItemManager.clear_props()
+    bpy.ops.wm.read_homefile(use_empty=True)
+
+
+def process_scene(scene_path: str, save_path: str, characters: list[str], exact_collisions: bool = False,
+                  camera_selection="all", seed=None):
     """
     Adds characters to a scene based on valid poses and saves the scene.
-    Returns list of camera_ids to render.
+    With exact_collisions, ground placements rejected by the bbox tests are re-checked against the exact meshes.
+    With a seed, the same scene and characters always give the same population.
+    Returns list of camera_ids to render, see select_cameras for camera_selection.
     """
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
     scene_manager = SceneManager()
     scene = scene_manager.load_scene(scene_path)
-
-    floor_area = scene_manager.get_floor_area()
-    floor_name = scene_manager.floor
-    valid_poses = scene_manager.get_valid_poses()
-    annotation_path = os.path.join(os.path.dirname(save_path), "annotations.json")
-
+    scene_analysis = SceneAnalysis(scene_manager)
+
+    floor_area = scene_analysis.floor_area
+    floor_name = scene_analysis.floor
+    valid_poses = scene_analysis.valid_poses
+    occupancy_map = OccupancyMap(floor_name)
+    footprint_cache = FootprintCache()
+    character_library = CharacterLibrary()
+    character_index = CharacterIndex.get(get_characters_root(characters[0])) if characters else None
+    collision_checker = CollisionChecker() if exact_collisions else None
+    annotation_manager = AnnotationManager(os.path.join(os.path.dirname(save_path), "annotations.json"))
+
+    new_rig_names = []
     print("Valid poses for this scene:", valid_poses)
 
     num_chars = np.random.randint(2, 3) if floor_area < 25.0 else np.random.randint(4, 6)
@@ -53,7 +122,7 @@ def process_scene(scene_path: str, save_path: str, characters: list[str]):
 
         for pose, keyword in prioritized_poses.items():
             if pose in valid_poses:
-                character = find_character_by_keyword(characters, keyword)
+                character = find_character_by_keyword(characters, keyword, character_index)
                 if character:
                     chosen_pose = pose
                     chosen_character = character
@@ -66,9 +135,10 @@ def process_scene(scene_path: str, save_path: str, characters: list[str]):
                 continue
 
             if "bathroom" in floor_name or "kitchen" in floor_name:
-                filtered = [char for char in characters if "doing" not in char and "smpli" in char]
+                filtered = [char for char in characters if not has_keyword(char, "doing", character_index)
+                            and has_keyword(char, "smpli", character_index)]
             else:
-                filtered = [char for char in characters if "smpli" in char]
+                filtered = [char for char in characters if has_keyword(char, "smpli", character_index)]
 
             if not filtered:
                 print("No suitable characters for fallback.")
@@ -82,33 +152,57 @@ def process_scene(scene_path: str, save_path: str, characters: list[str]):
         print(f"Pose: {chosen_pose}")
 
         # Import character
-        character_manager = CharacterManager(chosen_character)
+        existing_objects = set(scene_manager.scene.objects)
+        character_manager = CharacterManager(chosen_character, footprint_cache, scene_analysis, character_library)
+        import_start = time.perf_counter()
         character_manager.import_posed_fbx_character()
+        print(f"Imported {os.path.basename(chosen_character)} in {time.perf_counter() - import_start:.3f} s")
 
         # Set pose
-        pose_manager = PoseManager(character_manager)
+        pose_manager = PoseManager(character_manager, scene_analysis)
         pose_manager.set_pose(chosen_pose)
 
         if chosen_pose in positioning_required_poses:
-            positions = character_manager.find_valid_positions(scene_manager.floor)
+            # The rotation is drawn first so that the footprint validated for the position is the one that is used
+            rot = np.random.randint(0, 360)
+            positions = character_manager.find_valid_positions(floor_name, occupancy_map=occupancy_map,
+                                                               sampler="poisson", rotation=rot,
+                                                               collision_checker=collision_checker)
+            if collision_checker:
+                stats = collision_checker.pop_stats()
+                print(f"Exact collision checks: {stats['checks']}, recovered placements: {stats['recovered']}, "
+                      f"BVH build {stats['build_time']:.3f} s, checks {stats['check_time']:.3f} s")
             if positions:
                 pos = positions[np.random.randint(len(positions))]
-                rot = np.random.randint(0, 360)
                 print(f"Placing at position {pos}, rotation {rot}")
                 character_manager.place_character(pos)
                 character_manager.rotate_character(rot)
 
+        # Later placements must not drop characters onto this one
+        occupancy_map.stamp_character(character_manager.character)
+        new_objects = [obj for obj in scene_manager.scene.objects if obj not in existing_objects]
+        scene_manager.spatial_index.insert(new_objects)
+        scene_manager.category_index.insert(new_objects)
+
         # Add camera and annotate
         new_camera = character_manager.add_camera()
+        new_rig_names.append(new_camera.parent.name)
         cam_util.adjust_camera_sensor(new_camera)
 
-        annotation_manager = AnnotationManager(annotation_path)
         annotation_manager.add_annotation(character_manager)
+
+    # All annotations of the scene are written at once
+    if annotation_manager.annotations:
         annotation_manager.write_json()
+    print("Scene analysis cache:", scene_analysis.get_stats())
 
     # Save scene and return camera IDs
     camera_rigs = cam_util.get_camera_rigs()
-    camera_id_list = [[i, 0] for i in range(len(camera_rigs))]
+    new_rig_ids = [i for i, camera_rig in enumerate(camera_rigs) if camera_rig.name in new_rig_names]
+    scene_manager.scene[NEW_CAMERA_RIGS_PROPERTY] = json.dumps(new_rig_ids)
+    camera_id_list = select_cameras(len(camera_rigs), new_rig_ids, camera_selection)
 
+    # The PopulationCache copies the saved scene into other folders, where relative paths would no longer resolve
+    bpy.ops.file.make_paths_absolute()
     scene_manager.save_scene(save_path)
     return camera_id_list
@@ -0,0 +1,148 @@
+import os
+import time
+import queue
+import threading
+import traceback
+
+from InfinigenPopulator.logic.batch_logic import (collect_scene_folders, prepare_scene, render_prepared_scene,
+                                                  get_seed)
+from InfinigenPopulator.logic.blender_logic import reset_session
+from InfinigenPopulator.extras.file_io import write_json_atomic
+
+
+class PopulateRenderPipeline:
+    """
+    Overlaps population and rendering of a multi-scene run. The main thread populates the scenes (bpy is not thread
+    safe) and hands them to a render thread through a bounded queue, so scene k+1 is populated while scene k
+    renders. Renders run in subprocesses, so the render thread only waits on them. When the queue is full,
+    population waits for the renders to catch up. If the render thread dies, population stops with a RuntimeError
+    instead of waiting for it forever.
+    """
+
+    def __init__(self, output_root, characters, infinigen_path, exact_collisions=False, render_mode="legacy",
+                 render_options=None, camera_selection="all", population_options=None, queue_size=1):
+        if queue_size < 1:
+            raise ValueError(f"Pipeline queue size must be at least 1, got {queue_size}!")
+        self.output_root = os.path.abspath(output_root)
+        self.characters = list(characters)
+        self.infinigen_path = infinigen_path
+        self.exact_collisions = exact_collisions
+        self.render_mode = render_mode
+        self.render_options = render_options
+        self.camera_selection = camera_selection
+        self.population_options = population_options
+        self.queue_size = queue_size
+        self.scene_queue = queue.Queue(maxsize=queue_size)
+        self.render_stopped = threading.Event()
+        self._lock = threading.Lock()
+        self.depth_samples = []
+        self.populate_time = 0.0
+        self.render_time = 0.0
+        self.populate_blocked_time = 0.0
+        self.render_waiting_time = 0.0
+
+    def _sample_depth(self):
+        with self._lock:
+            self.depth_samples.append(self.scene_queue.qsize())
+
+    def _record(self, summary, summary_path, result):
+        with self._lock:
+            summary["succeeded" if result["status"] == "success" else "failed"] += 1
+            summary["scenes"].append(result)
+            print(f"[{len(summary['scenes'])} / {summary['total']}] {result['seed']}: {result['status']}")
+            write_json_atomic(summary_path, summary)
+
+    def _render_stage(self, summary, summary_path):
+        try:
+            while True:
+                start = time.perf_counter()
+                item = self.scene_queue.get()
+                self._sample_depth()
+                if item is None:
+                    break
+                self.render_waiting_time += time.perf_counter() - start
+                scene, result = item
+                start = time.perf_counter()
+                try:
+                    render_prepared_scene(scene, self.infinigen_path, self.render_mode, self.render_options)
+                    result["status"] = "success"
+                except Exception as e:
+                    traceback.print_exc()
+                    result["status"] = "failed"
+                    result["error"] = f"Rendering: {type(e).__name__}: {e}"
+                result["render_duration"] = round(time.perf_counter() - start, 2)
+                self.render_time += time.perf_counter() - start
+                self._record(summary, summary_path, result)
+        finally:
+            self.render_stopped.set()
+
+    def _put(self, item):
+        """Hands item to the render thread, waiting while the queue is full as long as the render thread runs."""
+        while True:
+            if self.render_stopped.is_set():
+                raise RuntimeError("The render stage stopped, see its traceback above.")
+            try:
+                self.scene_queue.put(item, timeout=1.0)
+                return
+            except queue.Full:
+                pass
+
+    def run(self, scenes_path):
+        """Populates and renders all seed folders of scenes_path (root folder or manifest), returns the summary."""
+        scene_folders = list(dict.fromkeys(os.path.abspath(folder) for folder in collect_scene_folders(scenes_path)))
+        summary_path = os.path.join(self.output_root, "batch_summary.json")
+        summary = {"scenes_path": os.path.abspath(scenes_path), "total": len(scene_folders), "succeeded": 0,
+                   "failed": 0, "scenes": []}
+        print(f"Found {len(scene_folders)} scenes to process, pipeline queue size {self.queue_size}.")
+
+        start = time.perf_counter()
+        render_thread = threading.Thread(target=self._render_stage, args=(summary, summary_path),
+                                         name="render-stage")
+        render_thread.start()
+        try:
+            for i, input_path in enumerate(scene_folders):
+                print(f"\n=== Populating scene {i + 1} / {len(scene_folders)}: {input_path} ===")
+                result = {"seed": get_seed(input_path), "input_folder": input_path}
+                populate_start = time.perf_counter()
+                try:
+                    scene = prepare_scene(input_path, self.output_root, self.characters, self.exact_collisions,
+                                          self.camera_selection, self.population_options)
+                    result["cameras"] = len(scene["camera_ids"])
+                except Exception as e:
+                    traceback.print_exc()
+                    scene = None
+                    result["status"] = "failed"
+                    result["error"] = f"Population: {type(e).__name__}: {e}"
+                finally:
+                    reset_session()
+                result["populate_duration"] = round(time.perf_counter() - populate_start, 2)
+                self.populate_time += time.perf_counter() - populate_start
+                if scene is None:
+                    self._record(summary, summary_path, result)
+                    continue
+                put_start = time.perf_counter()
+                self._put((scene, result))
+                self.populate_blocked_time += time.perf_counter() - put_start
+                self._sample_depth()
+        finally:
+            if not self.render_stopped.is_set():
+                self._put(None)
+            render_thread.join()
+
+        wall_time = time.perf_counter() - start
+        summary["pipeline"] = {
+            "queue_size": self.queue_size,
+            "max_queue_depth": max(self.depth_samples, default=0),
+            "mean_queue_depth": round(sum(self.depth_samples) / len(self.depth_samples), 2)
+            if self.depth_samples else 0.0,
+            "wall_time": round(wall_time, 2),
+            "populate_utilization": round(self.populate_time / wall_time, 3) if wall_time > 0 else 0.0,
+            "render_utilization": round(self.render_time / wall_time, 3) if wall_time > 0 else 0.0,
+            "populate_blocked_time": round(self.populate_blocked_time, 2),
+            "render_waiting_time": round(self.render_waiting_time, 2)}
+        write_json_atomic(summary_path, summary)
+        print(f"Pipeline done: {summary['succeeded']} succeeded, {summary['failed']} failed in {wall_time:.1f} s. "
+              f"Render stage utilization {summary['pipeline']['render_utilization']:.0%}, populate stage "
+              f"{summary['pipeline']['populate_utilization']:.0%}, max queue depth "
+              f"{summary['pipeline']['max_queue_depth']}. Summary: {summary_path}")
+        return summary
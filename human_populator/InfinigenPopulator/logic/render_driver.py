@@ -0,0 +1,96 @@
+import os
+import argparse
+from pathlib import Path
+
+import bpy
+import gin
+from infinigen.core import init
+from infinigen.core.tagging import tag_system
+from infinigen.core.placement import camera as cam_util
+from infinigen.core.rendering.render import render_image
+# Registers the configurables bound by the indoor gin configs, e.g. execute_tasks and compose_indoors
+from infinigen_examples import generate_indoors  # noqa: F401
+
+RENDER_FRAME = 48
+RENDER_PASSES = ("full", "flat")
+
+
+def load_scene(input_folder, seed, configs, overrides=()):
+    """Applies the gin configs and opens the populated scene once, like execute_tasks does for a render task."""
+    scene_seed = init.apply_scene_seed(seed)
+    init.apply_gin_configs(
+        configs=["base_indoors.gin"] + list(configs),
+        overrides=[f"execute_tasks.frame_range=[{RENDER_FRAME},{RENDER_FRAME}]"] + list(overrides),
+        config_folders=["infinigen_examples/configs_indoor", "infinigen_examples/configs_nature"],
+    )
+    bpy.ops.wm.open_mainfile(filepath=os.path.join(input_folder, "scene.blend"))
+    tag_system.load_tag(path=os.path.join(input_folder, "MaskTag.json"))
+    scene = bpy.context.scene
+    scene.frame_start = RENDER_FRAME
+    scene.frame_end = RENDER_FRAME
+    scene.frame_set(RENDER_FRAME)
+    # execute_tasks normally applies the resolution, e.g. the lower one of the draft profile
+    resolution_x, resolution_y = gin.query_parameter("execute_tasks.generate_resolution")
+    scene.render.resolution_x = resolution_x
+    scene.render.resolution_y = resolution_y
+    init.configure_blender()
+    return scene_seed
+
+
+def set_render_threads(threads):
+    """Limits Cycles to a fixed number of threads, e.g. when several renders share the machine. 0 uses all."""
+    render = bpy.context.scene.render
+    render.threads_mode = "FIXED" if threads else "AUTO"
+    if threads:
+        render.threads = threads
+
+
+def reset_compositor():
+    """render_image adds its compositor nodes to the existing ones, a fresh generate_indoors process has none."""
+    scene = bpy.context.scene
+    if scene.node_tree is not None:
+        scene.node_tree.nodes.clear()
+
+
+def render_cameras(output_folder, camera_ids, passes=RENDER_PASSES):
+    """
+    Renders every camera with the 'full' and then the 'flat' render_image config (or only the given passes), into
+    the same frames folder layout as the per-camera generate_indoors render tasks.
+    """
+    frames_folder = Path(output_folder)
+    frames_folder.mkdir(parents=True, exist_ok=True)
+    camera_rigs = cam_util.get_camera_rigs()
+    cameras = [camera_rigs[camrig_id].children[subcam_id] for camrig_id, subcam_id in camera_ids]
+    # Flat shading replaces the scene materials, so all full renders have to be done before the first flat one
+    for scope in [scope for scope in RENDER_PASSES if scope in passes]:
+        for camera_id, camera in zip(camera_ids, cameras):
+            print(f"Rendering {scope} pass of camera {camera_id} with {bpy.context.scene.render.threads} threads")
+            cam_util.set_active_camera(camera)
+            with gin.config_scope(scope):
+                # Samples and denoising may differ per scope and render profile
+                init.configure_render_cycles()
+                reset_compositor()
+                render_image(camera=camera, frames_folder=frames_folder)
+
+
+def main():
+    """Renders several cameras of a populated scene in one process. Run from the infinigen checkout."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input_folder", required=True)
+    parser.add_argument("--output_folder", required=True)
+    parser.add_argument("--seed", required=True)
+    parser.add_argument("--camera_ids", nargs="+", required=True, help="Cameras as rig,subcam pairs, e.g. 0,0 1,0")
+    parser.add_argument("-g", "--configs", nargs="*", default=["singleroom.gin"])
+    parser.add_argument("-p", "--overrides", nargs="*", default=[])
+    parser.add_argument("--passes", nargs="+", choices=RENDER_PASSES, default=list(RENDER_PASSES))
+    parser.add_argument("--threads", type=int, default=0, help="Cycles render threads, 0 uses all cores.")
+    args = parser.parse_args()
+
+    camera_ids = [tuple(int(i) for i in camera_id.split(",")) for camera_id in args.camera_ids]
+    load_scene(os.path.abspath(args.input_folder), args.seed, args.configs, args.overrides)
+    set_render_threads(args.threads)
+    render_cameras(os.path.abspath(args.output_folder), camera_ids, args.passes)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,62 @@
 import os
+import time
+import shutil
 import subprocess
-import gin
 
-def render_images_gt(scene_folder, frames_folder, seed, camera_ids):
+RENDER_MODES = ("legacy", "single-process", "concurrent")
+RENDER_PASSES = ("full", "flat")
+# Each profile renders with its gin overrides on top of singleroom.gin into a folder named frames, as infinigen's
+# render_image moves its outputs into <parent of the frames folder>/frames and keeps its temporary files in
+# <parent>/tmp. Profiles other than production therefore get their own parent folder next to fine/.
+RENDER_PROFILES = {
+    "production": {"frames_folder": "frames", "overrides": []},
+    "draft": {"frames_folder": os.path.join("draft", "frames"), "overrides": [
+        "execute_tasks.generate_resolution=(640,360)",
+        "configure_render_cycles.min_samples=1",
+        "configure_render_cycles.num_samples=16",
+        "configure_render_cycles.denoise=False",
+        "full/configure_render_cycles.min_samples=1",
+        "full/configure_render_cycles.num_samples=16",
+        "full/configure_render_cycles.denoise=False",
+    ]},
+}
+
+
+def get_frames_folder(output_scene_dir, profile="production"):
+    if profile not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile '{profile}'! Must be one of {tuple(RENDER_PROFILES)}.")
+    return os.path.join(output_scene_dir, RENDER_PROFILES[profile]["frames_folder"])
+
+
+def run_render(render_cmd, jobs, manifest=None, cwd=None, env=None):
+    """Runs a render command and records its (camera id, pass) jobs as done in the manifest."""
+    before = manifest.snapshot() if manifest is not None else None
+    print("Running command:", " ".join(render_cmd))
+    subprocess.run(render_cmd, check=True, cwd=cwd, env=env)
+    if manifest is not None:
+        manifest.record(jobs, before)
+
+
+def is_rendered(manifest, camera_id, render_pass):
+    if manifest is not None and manifest.is_complete(camera_id, render_pass):
+        print(f"Skipping {render_pass} pass of camera {camera_id}, already rendered.")
+        return True
+    return False
+
+
+def render_images_gt(scene_folder, frames_folder, seed, camera_ids, cwd=None, manifest=None, overrides=(),
+                     passes=RENDER_PASSES):
+    """
+    Renders the full image and the flat ground truth of every camera. cwd is the infinigen checkout to run from.
+    With a RenderManifest, renders it records as done are skipped and finished ones are recorded. overrides are
+    additional gin bindings, passes limits the rendered passes. Every render is a fresh generate_indoors process
+    with its own gin config, nothing is configured in this process (which may be populating the next scene).
+    """
     input_folder = os.path.expanduser(scene_folder)
     output_folder = os.path.expanduser(frames_folder)
     for camera_id in camera_ids:
         camrig_id, subcam_id = camera_id
         print("Camera: ", camrig_id, subcam_id)
-        gin.clear_config(clear_constants=True)
         print("Rendering images: ")
         render_full_cmd = [
             "python",
@@ -22,11 +70,11 @@ def render_images_gt(scene_folder, frames_folder, seed, camera_ids):
             "-g", "singleroom.gin",
             "-p", "render.render_image_func=@full/render_image",
             "execute_tasks.frame_range=[48,48]",
-            f"execute_tasks.camera_id={camera_id}"
+            f"execute_tasks.camera_id={camera_id}",
+            *overrides
         ]
-        print("Running command:", " ".join(render_full_cmd))
-        subprocess.run(render_full_cmd, check=True)
-        gin.clear_config(clear_constants=True)
+        if "full" in passes and not is_rendered(manifest, camera_id, "full"):
+            run_render(render_full_cmd, [(camera_id, "full")], manifest, cwd)
         print("Rendering ground truth: ")
         render_flat_cmd = [
             "python",
@@ -40,9 +88,183 @@ def render_images_gt(scene_folder, frames_folder, seed, camera_ids):
             "-g", "singleroom.gin",
             "-p", "render.render_image_func=@flat/render_image",
             "execute_tasks.frame_range=[48,48]",
-            f"execute_tasks.camera_id={camera_id}"
+            f"execute_tasks.camera_id={camera_id}",
+            *overrides
         ]
-        print("Running command:", " ".join(render_flat_cmd))
-        subprocess.run(render_flat_cmd, check=True)
+        if "flat" in passes and not is_rendered(manifest, camera_id, "flat"):
+            run_render(render_flat_cmd, [(camera_id, "flat")], manifest, cwd)
+
+
+def get_render_driver_env(threads=0):
+    """
+    Returns the environment for render_driver processes, which run from the infinigen checkout. With threads, the
+    OpenMP and BLAS pools of the process are limited to the same number of threads as its Cycles render.
+    """
+    populator_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [populator_root, env.get("PYTHONPATH")]))
+    if threads:
+        for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+            env[variable] = str(threads)
+    return env
+
+
+def get_render_driver_cmd(scene_folder, frames_folder, seed, camera_ids, passes=None, threads=0, overrides=()):
+    render_cmd = [
+        "python",
+        "-m", "InfinigenPopulator.logic.render_driver",
+        "--input_folder", os.path.expanduser(scene_folder),
+        "--output_folder", os.path.expanduser(frames_folder),
+        "--seed", seed,
+        "--camera_ids", *[f"{camrig_id},{subcam_id}" for camrig_id, subcam_id in camera_ids],
+        "-g", "singleroom.gin",
+    ]
+    if passes:
+        render_cmd += ["--passes", *passes]
+    if threads:
+        render_cmd += ["--threads", str(threads)]
+    if overrides:
+        render_cmd += ["-p", *overrides]
+    return render_cmd
+
+
+def render_images_gt_single_process(scene_folder, frames_folder, seed, camera_ids, cwd=None, manifest=None,
+                                    overrides=(), passes=RENDER_PASSES, threads=0):
+    """
+    Renders the full image and the flat ground truth of every camera with one render_driver process, which loads
+    the scene once instead of twice per camera. The frames folder layout is the same as with render_images_gt.
+    With a RenderManifest, only the missing renders are done, in one process per distinct set of cameras. threads
+    limits the render threads, 0 uses all cores.
+    """
+    jobs = [(tuple(camera_id), render_pass) for camera_id in camera_ids for render_pass in passes
+            if not is_rendered(manifest, camera_id, render_pass)]
+    cameras_per_pass = {render_pass: [camera_id for camera_id, job_pass in jobs if job_pass == render_pass]
+                        for render_pass in passes}
+    if all(cameras == cameras_per_pass[passes[0]] for cameras in cameras_per_pass.values()):
+        runs = [(cameras_per_pass[passes[0]], list(passes))]
+    else:
+        runs = [(cameras, [render_pass]) for render_pass, cameras in cameras_per_pass.items()]
+    for cameras, run_passes in runs:
+        if cameras:
+            render_cmd = get_render_driver_cmd(scene_folder, frames_folder, seed, cameras, run_passes, threads,
+                                               overrides)
+            run_render(render_cmd, [(camera_id, render_pass) for camera_id in cameras for render_pass in run_passes],
+                       manifest, cwd, get_render_driver_env(threads))
+
+
+def get_job_frames_folder(frames_folder, camera_id, render_pass):
+    """
+    Private frames folder of one concurrent render, in <parent of frames_folder>/jobs/<rig>_<subcam>_<pass>/frames.
+    render_image keeps its temporary files next to the frames folder and reorganizes everything in it, so renders
+    running at the same time must not share one.
+    """
+    camrig_id, subcam_id = camera_id
+    return os.path.join(os.path.dirname(os.path.normpath(frames_folder)), "jobs",
+                        f"{camrig_id}_{subcam_id}_{render_pass}", "frames")
+
+
+def merge_frames_folder(job_frames_folder, frames_folder):
+    """Moves the outputs of a finished render into frames_folder at the same relative paths, removes its job folder."""
+    for root, _, names in os.walk(job_frames_folder):
+        for name in names:
+            path = os.path.join(root, name)
+            target = os.path.join(frames_folder, os.path.relpath(path, job_frames_folder))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(path, target)
+    shutil.rmtree(os.path.dirname(job_frames_folder))
+
+
+def render_images_gt_concurrent(scene_folder, frames_folder, seed, camera_ids, cwd=None, jobs=2, total_threads=None,
+                                keep_going=False, manifest=None, overrides=(), passes=RENDER_PASSES):
+    """
+    Runs the full and the flat render of every camera as separate render_driver processes, jobs of them at a time.
+    The cores (total_threads, all by default) are split evenly between the running renders. Every render writes
+    into its own job folder (see get_job_frames_folder), which is merged into frames_folder once it succeeded.
+    The first failing render terminates the others and raises, with keep_going all renders are attempted and a
+    RuntimeError listing the failed ones is raised at the end. With a RenderManifest, renders it records as done
+    are skipped and finished ones are recorded.
+    """
+    if jobs < 1:
+        raise ValueError(f"Number of render jobs must be at least 1, got {jobs}!")
+    threads = max(1, (total_threads or os.cpu_count() or 1) // jobs)
+    env = get_render_driver_env(threads)
+    pending = [(tuple(camera_id), render_pass) for render_pass in passes for camera_id in camera_ids
+               if not is_rendered(manifest, camera_id, render_pass)]
+    num_renders = len(pending)
+    running = {}
+    failed = []
+    sequential_time = 0.0
+    start = time.perf_counter()
+    try:
+        while pending or running:
+            while pending and len(running) < jobs:
+                camera_id, render_pass = pending.pop(0)
+                job_frames_folder = get_job_frames_folder(frames_folder, camera_id, render_pass)
+                # Left over by an interrupted run
+                shutil.rmtree(os.path.dirname(job_frames_folder), ignore_errors=True)
+                render_cmd = get_render_driver_cmd(scene_folder, job_frames_folder, seed, [camera_id], [render_pass],
+                                                   threads, overrides)
+                print(f"Rendering {render_pass} pass of camera {camera_id} with {threads} threads:",
+                      " ".join(render_cmd))
+                running[subprocess.Popen(render_cmd, cwd=cwd, env=env)] = (camera_id, render_pass,
+                                                                           job_frames_folder, time.perf_counter())
+            time.sleep(0.1)
+            for process, (camera_id, render_pass, job_frames_folder, job_start) in list(running.items()):
+                if process.poll() is None:
+                    continue
+                del running[process]
+                sequential_time += time.perf_counter() - job_start
+                if process.returncode != 0:
+                    if not keep_going:
+                        raise subprocess.CalledProcessError(process.returncode, process.args)
+                    print(f"Rendering {render_pass} pass of camera {camera_id} failed with exit code "
+                          f"{process.returncode}!")
+                    failed.append((camera_id, render_pass))
+                    continue
+                # Merges happen one at a time in this process, so the manifest sees exactly the files of this render
+                before = manifest.snapshot() if manifest is not None else None
+                merge_frames_folder(job_frames_folder, frames_folder)
+                if manifest is not None:
+                    manifest.record([(camera_id, render_pass)], before)
+    finally:
+        for process in running:
+            process.terminate()
+        for process in running:
+            process.wait()
+        jobs_folder = os.path.join(os.path.dirname(os.path.normpath(frames_folder)), "jobs")
+        if os.path.isdir(jobs_folder) and not os.listdir(jobs_folder):
+            os.rmdir(jobs_folder)
+
+    wall_time = time.perf_counter() - start
+    print(f"Rendered {num_renders} passes with {jobs} jobs x {threads} threads in "
+          f"{wall_time:.1f} s wall-clock, {sequential_time:.1f} s of render time "
+          f"({sequential_time / wall_time if wall_time > 0 else 0.0:.2f}x).")
+    if failed:
+        raise RuntimeError(f"Failed renders (camera, pass): {failed}")
 
 
+def render_scene(scene_folder, frames_folder, seed, camera_ids, cwd=None, mode="legacy", manifest=None,
+                 profile="production", skip_flat=False, threads=0, **render_options):
+    """
+    Renders the cameras with the given render mode and profile (see RENDER_PROFILES), render_options are passed on
+    to the concurrent scheduler. skip_flat renders the full images only. threads limits the render threads of the
+    single-process mode (the concurrent one splits total_threads), the legacy mode always uses all cores. With a
+    RenderManifest, only the renders missing from it are done.
+    """
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode '{mode}'! Must be one of {RENDER_MODES}.")
+    if profile not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile '{profile}'! Must be one of {tuple(RENDER_PROFILES)}.")
+    overrides = RENDER_PROFILES[profile]["overrides"]
+    passes = ("full",) if skip_flat else RENDER_PASSES
+    if mode == "legacy":
+        render_images_gt(scene_folder, frames_folder, seed, camera_ids, cwd=cwd, manifest=manifest,
+                         overrides=overrides, passes=passes)
+    elif mode == "single-process":
+        render_images_gt_single_process(scene_folder, frames_folder, seed, camera_ids, cwd=cwd, manifest=manifest,
+                                        overrides=overrides, passes=passes, threads=threads)
+    elif mode == "concurrent":
+        render_images_gt_concurrent(scene_folder, frames_folder, seed, camera_ids, cwd=cwd, manifest=manifest,
+                                    overrides=overrides, passes=passes, **render_options)
+    if manifest is not None:
+        manifest.refresh()
@@ -0,0 +1,220 @@
+import os
+import sys
+import time
+import queue
+import traceback
+import contextlib
+import multiprocessing
+
+import bpy
+
+from InfinigenPopulator.logic.batch_logic import (collect_scene_folders, prepare_scene, render_prepared_scene,
+                                                  get_seed)
+from InfinigenPopulator.logic.blender_logic import reset_session
+from InfinigenPopulator.extras.file_io import write_json_atomic
+
+
+def _redirect_output(log_path):
+    """Sends everything the worker prints, including Blender and render subprocess output, to its log file."""
+    log_file = open(log_path, 'a', buffering=1)
+    os.dup2(log_file.fileno(), sys.stdout.fileno())
+    os.dup2(log_file.fileno(), sys.stderr.fileno())
+    sys.stdout = sys.stderr = log_file
+
+
+@contextlib.contextmanager
+def _without_blender_paths():
+    """
+    A spawned worker starts with the sys.path of this process, which after importing bpy begins with the script
+    folders of Blender. Their pure Python bpy package would shadow the bpy module in the worker, so they are left
+    out while a worker starts. The worker adds them back when it imports bpy itself.
+    """
+    blender_dirs = tuple(os.path.join(path, "") for path in (bpy.utils.resource_path(kind)
+                                                             for kind in ("LOCAL", "USER", "SYSTEM")) if path)
+    sys_path = list(sys.path)
+    sys.path[:] = [path for path in sys_path if not os.path.join(path, "").startswith(blender_dirs)]
+    try:
+        yield
+    finally:
+        sys.path[:] = sys_path
+
+
+def _worker_main(worker_id, task_queue, result_queue, output_root, characters, infinigen_path, exact_collisions,
+                 render_mode, render_options, camera_selection, population_options, log_dir):
+    _redirect_output(os.path.join(log_dir, f"worker_{worker_id}.log"))
+    while True:
+        input_path = task_queue.get()
+        if input_path is None:
+            break
+        result_queue.put(("started", worker_id, input_path))
+        print(f"\n=== Worker {worker_id}: {input_path} ===")
+        start = time.perf_counter()
+        result = {"seed": get_seed(input_path), "input_folder": input_path, "worker": worker_id}
+        try:
+            scene = prepare_scene(input_path, output_root, characters, exact_collisions, camera_selection,
+                                  population_options)
+            render_prepared_scene(scene, infinigen_path, render_mode, render_options)
+            result["cameras"] = len(scene["camera_ids"])
+            result["status"] = "success"
+        except Exception as e:
+            traceback.print_exc()
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            reset_session()
+        result["duration"] = round(time.perf_counter() - start, 2)
+        result_queue.put(("done", worker_id, result))
+
+
+class WorkerPool:
+    """
+    Populates seed folders in num_workers processes, each with its own bpy instance. Seed folders are handed out
+    through a bounded queue. A scene that raises is recorded as failed, a worker that dies (e.g. a segfault in
+    Blender) has its scene recorded as crashed and is replaced, so one scene never stops the batch.
+    The cores are split between the workers, see get_worker_render_options. Legacy renders cannot be limited in
+    threads, so they are only allowed with a single worker.
+    """
+
+    def __init__(self, num_workers, output_root, characters, infinigen_path, exact_collisions=False,
+                 render_mode="single-process", render_options=None, camera_selection="all", population_options=None,
+                 queue_size=None):
+        if num_workers < 1:
+            raise ValueError(f"Number of workers must be at least 1, got {num_workers}!")
+        if render_mode == "legacy" and num_workers > 1:
+            raise ValueError("Legacy renders always use all cores, use the single-process or concurrent render mode "
+                             "with more than one worker!")
+        self.num_workers = num_workers
+        self.output_root = os.path.abspath(output_root)
+        self.characters = list(characters)
+        self.infinigen_path = infinigen_path
+        self.exact_collisions = exact_collisions
+        self.render_mode = render_mode
+        self.render_options = WorkerPool.get_worker_render_options(render_mode, render_options, num_workers)
+        self.camera_selection = camera_selection
+        self.population_options = population_options
+        self.log_dir = os.path.join(self.output_root, "logs")
+        # Blender is not fork-safe, every worker starts a fresh interpreter
+        self.context = multiprocessing.get_context("spawn")
+        self.task_queue = self.context.Queue(maxsize=queue_size or 2 * num_workers)
+        self.result_queue = self.context.Queue()
+        self.workers = {}
+        self.in_flight = {}
+        self.next_worker_id = 0
+
+    @staticmethod
+    def get_worker_render_options(render_mode, render_options, num_workers):
+        """
+        Returns the render options of one worker, with its share of the cores (total_threads, all by default) so
+        that the renders of all workers together do not oversubscribe the machine: the concurrent scheduler of a
+        worker splits total_threads // num_workers, a single-process render uses as many threads.
+        """
+        render_options = dict(render_options or {})
+        worker_threads = max(1, (render_options.get("total_threads") or os.cpu_count() or 1) // num_workers)
+        if render_mode == "concurrent":
+            render_options["total_threads"] = worker_threads
+            render_options["jobs"] = min(render_options.get("jobs", 2), worker_threads)
+        elif render_mode == "single-process":
+            render_options["threads"] = worker_threads
+        return render_options
+
+    def _start_worker(self):
+        worker_id = self.next_worker_id
+        self.next_worker_id += 1
+        process = self.context.Process(
+            target=_worker_main, name=f"populate-worker-{worker_id}",
+            args=(worker_id, self.task_queue, self.result_queue, self.output_root, self.characters,
+                  self.infinigen_path, self.exact_collisions, self.render_mode, self.render_options,
+                  self.camera_selection, self.population_options, self.log_dir))
+        with _without_blender_paths():
+            process.start()
+        self.workers[worker_id] = process
+
+    def _reap_crashed_workers(self):
+        """Returns the results of the scenes whose worker died and starts a replacement for every dead worker."""
+        results = []
+        for worker_id, process in list(self.workers.items()):
+            if process.is_alive():
+                continue
+            # Do not miss a scene the worker reported as started just before dying
+            while worker_id not in self.in_flight:
+                try:
+                    message, started_id, payload = self.result_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if message == "started":
+                    self.in_flight[started_id] = (payload, time.perf_counter())
+                else:
+                    self.in_flight.pop(started_id, None)
+                    results.append(payload)
+            del self.workers[worker_id]
+            if worker_id in self.in_flight:
+                input_path, start = self.in_flight.pop(worker_id)
+                print(f"Worker {worker_id} died with exit code {process.exitcode} on {input_path}!")
+                results.append({"seed": get_seed(input_path), "input_folder": input_path, "worker": worker_id,
+                                "status": "crashed", "error": f"Worker exited with code {process.exitcode}",
+                                "duration": round(time.perf_counter() - start, 2)})
+            self._start_worker()
+        return results
+
+    def run(self, scenes_path):
+        """Processes all seed folders of scenes_path (root folder or manifest) and returns the batch summary."""
+        scene_folders = list(dict.fromkeys(os.path.abspath(folder) for folder in collect_scene_folders(scenes_path)))
+        os.makedirs(self.log_dir, exist_ok=True)
+        summary_path = os.path.join(self.output_root, "batch_summary.json")
+        summary = {"scenes_path": os.path.abspath(scenes_path), "workers": self.num_workers, "succeeded": 0,
+                   "failed": 0, "scenes": []}
+        print(f"Found {len(scene_folders)} scenes to process with {self.num_workers} workers, render options per "
+              f"worker {self.render_options}. Worker logs: {self.log_dir}")
+
+        start = time.perf_counter()
+        for _ in range(self.num_workers):
+            self._start_worker()
+        pending = list(reversed(scene_folders))
+        finished = set()
+        while len(summary["scenes"]) < len(scene_folders):
+            while pending:
+                try:
+                    self.task_queue.put_nowait(pending[-1])
+                except queue.Full:
+                    break
+                pending.pop()
+            results = []
+            try:
+                message, worker_id, payload = self.result_queue.get(timeout=1.0)
+            except queue.Empty:
+                pass
+            else:
+                if message == "started":
+                    self.in_flight[worker_id] = (payload, time.perf_counter())
+                else:
+                    self.in_flight.pop(worker_id, None)
+                    results.append(payload)
+            results.extend(self._reap_crashed_workers())
+            for result in results:
+                # A worker that dies right after reporting its scene must not count that scene twice
+                if result["input_folder"] in finished:
+                    continue
+                finished.add(result["input_folder"])
+                summary["succeeded" if result["status"] == "success" else "failed"] += 1
+                summary["scenes"].append(result)
+                print(f"[{len(summary['scenes'])} / {len(scene_folders)}] {result['seed']}: {result['status']} "
+                      f"({result['duration']:.1f} s, worker {result['worker']})")
+                write_json_atomic(summary_path, summary)
+
+        for _ in self.workers:
+            self.task_queue.put(None)
+        for process in self.workers.values():
+            process.join()
+
+        wall_time = time.perf_counter() - start
+        busy_time = sum(result["duration"] for result in summary["scenes"])
+        summary["throughput"] = {
+            "wall_time": round(wall_time, 2),
+            "scenes_per_hour": round(len(scene_folders) / wall_time * 3600, 2) if wall_time > 0 else 0.0,
+            # Close to the number of workers when the pool scales linearly
+            "effective_parallelism": round(busy_time / wall_time, 2) if wall_time > 0 else 0.0}
+        write_json_atomic(summary_path, summary)
+        print(f"Batch done: {summary['succeeded']} succeeded, {summary['failed']} failed in {wall_time:.1f} s, "
+              f"{summary['throughput']['scenes_per_hour']} scenes/h, effective parallelism "
+              f"{summary['throughput']['effective_parallelism']} of {self.num_workers}. Summary: {summary_path}")
+        return summary
@@ -1,14 +1,38 @@
 import json
 import os
 
+from InfinigenPopulator.extras.file_io import write_json_atomic
+
+
+def read_annotations(annotation_path):
+    """
+    Returns the annotations of a file written by AnnotationManager as a list of dicts. A single JSON object is
+    wrapped in a list, an unreadable file gives no annotations.
+    """
+    if not os.path.isfile(annotation_path):
+        return []
+    with open(annotation_path, 'r') as annotation_file:
+        try:
+            data = json.load(annotation_file)
+        except json.JSONDecodeError:
+            return []
+    return data if isinstance(data, list) else [data]
+
 
 class AnnotationManager:
+    """
+    Collects the annotations of one scene. They are buffered and write_json writes them, after the annotations the
+    file already held, as one JSON list with an atomic rename, so it is called once per scene.
+    """
+
     def __init__(self, annotation_path):
         self.annotation_path = annotation_path
         self.scene_data = None
         self.character_data = []
         self.relations_data = []
         self.annotation = {}
+        self.annotations = []
+        self._existing_annotations = None
 
     def set_scene_data(self, scene_data):
         self.scene_data = scene_data
@@ -20,6 +44,7 @@ class AnnotationManager:
             "relations": character_manager.relations,
             "camera": character_manager.camera,
         }
+        self.annotations.append(self.annotation)
 
 
     def add_relation_data(self, relation_data):
@@ -27,24 +52,12 @@ class AnnotationManager:
 
 
     def write_json(self):
-        if not self.annotation:
+        if not self.annotations:
             raise RuntimeError("No character data.")
         try:
-            existing_data = []
-            if os.path.isfile(self.annotation_path):
-                with open(self.annotation_path, 'r') as json_file:
-                    try:
-                        existing_data = json.load(json_file)
-                    except json.JSONDecodeError:
-                        existing_data = []
-
-            if not isinstance(existing_data, list):
-                # If the existing data isn't a list, wrap it in one.
-                existing_data = [existing_data]
-
-            existing_data.append(self.annotation)
-            with open( self.annotation_path, 'w') as json_file:
-                json.dump(existing_data, json_file, indent=4)
+            if self._existing_annotations is None:
+                self._existing_annotations = read_annotations(self.annotation_path)
+            write_json_atomic(self.annotation_path, self._existing_annotations + self.annotations)
             print(f"Json saved to { self.annotation_path}")
         except Exception as e:
             raise RuntimeError(f"Error writing JSON file: {e}")
\ No newline at end of file
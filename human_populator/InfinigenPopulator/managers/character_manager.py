@@ -5,6 +5,8 @@ import bpy
 from mathutils import Vector
 from InfinigenPopulator.managers.item_manager import ItemManager
 from InfinigenPopulator.extras.utils import Utils
+from InfinigenPopulator.extras.footprint_cache import FootprintCache
+from InfinigenPopulator.extras.character_library import CharacterLibrary
 # noinspection PyUnresolvedReferences
 from numpy import radians
 import os
@@ -12,7 +14,7 @@ import os
 
 
 class CharacterManager:
-    def __init__(self, character_path):
+    def __init__(self, character_path, footprint_cache=None, scene_analysis=None, character_library=None):
         self.character_path = character_path
         self.character = None
         self.pose = character_path.split('/')[-1].split('.')[0]
@@ -21,6 +23,9 @@ class CharacterManager:
         self.mesh = None
         self.camera = None
         self.interacted_obj = None
+        self.footprint_cache = footprint_cache
+        self.scene_analysis = scene_analysis
+        self.character_library = character_library
 
 
     def import_character(self):
@@ -28,7 +33,7 @@ class CharacterManager:
             existing_objects = set(bpy.data.objects)
             bpy.ops.import_scene.fbx(filepath=self.character_path)
             new_objects = set(bpy.data.objects) - existing_objects
-            armatures = [obj for obj in new_objects if obj.type == 'ARMATURE']
+            armatures = sorted((obj for obj in new_objects if obj.type == 'ARMATURE'), key=lambda obj: obj.name)
             self.character = armatures[0]
             mesh_children = [obj for obj in self.character.children if obj.type == "MESH"]
             self.mesh = mesh_children[0].name
@@ -41,7 +46,7 @@ class CharacterManager:
             existing_objects = set(bpy.data.objects)
             bpy.ops.import_scene.fbx(filepath=os.path.join(self.character_path))
             new_objects = set(bpy.data.objects) - existing_objects
-            new_obj = [obj for obj in new_objects]
+            new_obj = sorted(new_objects, key=lambda obj: obj.name)
             for obj in new_obj:
                 if obj.type == "ARMATURE" and "smpl" in obj.name.lower():
                     self.character = obj
@@ -56,11 +61,13 @@ class CharacterManager:
 
 
     def import_posed_fbx_character(self):
+        """Imports the posed character, from its .blend library if a CharacterLibrary is set."""
         try:
-            existing_objects = set(bpy.data.objects)
-            bpy.ops.import_scene.fbx(filepath=self.character_path)
-            new_objects = set(bpy.data.objects) - existing_objects
-            new_obj = [obj for obj in new_objects]
+            if self.character_library:
+                new_objects = self.character_library.import_character(self.character_path)
+            else:
+                new_objects = CharacterLibrary.import_fbx(self.character_path)
+            new_obj = sorted(new_objects, key=lambda obj: obj.name)
             for obj in new_obj:
                 if obj.type == "ARMATURE" and "smpl" in obj.name.lower():
                     self.character = obj
@@ -119,8 +126,47 @@ class CharacterManager:
         child.name = armature_name
 
 
-    def find_valid_positions(self, floor_name=None, grid_spacing=0.35):
-        valid_positions = Utils.get_valid_ground_positions(self.character, floor_name,  grid_spacing)
+    def get_footprint(self, degrees=0):
+        """Footprint polygon of the posed character relative to its location, rotated like rotate_character."""
+        if not self.footprint_cache:
+            self.footprint_cache = FootprintCache()
+        return Utils.rotate_footprint(self.footprint_cache.get(self.character_path, self.character), degrees)
+
+    def get_collision_proxy(self, degrees=0):
+        """Convex low-poly proxy (vertices, triangles) of the posed character, rotated like rotate_character."""
+        if not self.footprint_cache:
+            self.footprint_cache = FootprintCache()
+        return Utils.rotate_proxy(self.footprint_cache.get_proxy(self.character_path, self.character), degrees)
+
+    def find_valid_positions(self, floor_name=None, grid_spacing=0.35, occupancy_map=None, sampler="grid",
+                             max_positions=1, rotation=None, collision_checker=None):
+        """
+        sampler="grid" validates every grid cell of the floor. sampler="poisson" stops after max_positions
+        collision-free positions in random Poisson-disk order and only falls back to the grid if it finds none.
+        If the rotation (degrees) the character will be placed with is given, its rotated footprint is tested.
+        The bbox tests use the convex collision proxy of the character. With a CollisionChecker, positions
+        rejected by them are re-checked with the triangles of the proxy against the exact obstacle meshes.
+        Without floor_name, the floor of the injected SceneAnalysis is used.
+        """
+        if floor_name is None and self.scene_analysis is not None:
+            floor_name = self.scene_analysis.floor
+        if sampler not in ("grid", "poisson"):
+            raise ValueError(f"Unknown position sampler '{sampler}'! Must be 'grid' or 'poisson'.")
+        footprint = self.get_footprint(rotation) if rotation is not None else None
+        proxy = self.get_collision_proxy(rotation or 0)
+        exact_check = collision_checker.bind(self.character, rotation or 0, proxy) if collision_checker else None
+        valid_positions = []
+        if sampler == "poisson":
+            valid_positions = list(Utils.sample_valid_ground_positions(
+                self.character, floor_name, grid_spacing, max_positions, occupancy_map, footprint, exact_check,
+                proxy))
+        if not valid_positions:
+            if occupancy_map is not None:
+                valid_positions = occupancy_map.get_free_positions(self.character, grid_spacing, footprint,
+                                                                   exact_check, proxy)
+            else:
+                valid_positions = Utils.get_valid_ground_positions(self.character, floor_name,  grid_spacing,
+                                                                   footprint, exact_check, proxy)
         if not valid_positions:
             print("Found no valid positions! Kept at origin coordinates!")
             valid_positions = [self.character.location]
@@ -3,22 +3,79 @@ import bpy
 from numpy import radians
 # noinspection PyUnresolvedReferences
 from mathutils import Vector
+from InfinigenPopulator.extras.utils import ASSETS_DIR
+
+ITEMS_DIR = os.path.join(ASSETS_DIR, "items")
+
 
 class ItemManager:
+    """
+    Props are loaded from disk once per session. The first use of a prop is the loaded objects themselves, later
+    uses are linked duplicates of all of them that share their meshes and materials.
+    """
+
+    # prop key -> (names of the loaded objects, name of their root, world matrix of the root right after loading)
+    _props = {}
 
     def __init__(self):
         self.item = None
         self.item_origin = None
 
+    @classmethod
+    def clear_props(cls):
+        cls._props = {}
+
+    @staticmethod
+    def _get_root(objects):
+        """
+        Returns the object of a loaded prop that all others hang below, the one with the most descendants. Other
+        objects without a parent in the prop are parented to it, so that the whole prop follows the item.
+        """
+        roots = sorted((obj for obj in objects if obj.parent not in objects),
+                       key=lambda obj: (-len(obj.children_recursive), obj.name))
+        for obj in roots[1:]:
+            matrix_world = obj.matrix_world.copy()
+            obj.parent = roots[0]
+            obj.matrix_world = matrix_world
+        return roots[0]
+
+    def _instance_prop(self, key, load):
+        """
+        Sets self.item to the root of an instance of the prop key, calling load() to get its objects from disk only
+        once. An instance copies every object of the prop with the same parenting.
+        """
+        names, root_name, matrix_world = ItemManager._props.get(key, ((), None, None))
+        prototypes = [bpy.data.objects.get(name) for name in names]
+        if not prototypes or None in prototypes:
+            objects = load()
+            if not objects:
+                raise RuntimeError(f"No objects loaded for item {key}!")
+            item = ItemManager._get_root(objects)
+            ItemManager._props[key] = (sorted(obj.name for obj in objects), item.name, item.matrix_world.copy())
+        else:
+            # The copies share the object data, the children keep their transform relative to their parent
+            copies = {prototype: prototype.copy() for prototype in prototypes}
+            for prototype, copy in copies.items():
+                bpy.context.collection.objects.link(copy)
+                if prototype.name != root_name:
+                    copy.parent = copies[prototype.parent]
+            # The root is reset to the transform of a fresh import
+            item = copies[bpy.data.objects[root_name]]
+            item.parent = None
+            item.matrix_world = matrix_world
+        self.item = item
+        self.item_origin = "import"
+
+    @staticmethod
+    def _load_fbx(item_path):
+        existing_objects = set(bpy.data.objects)
+        bpy.ops.import_scene.fbx(filepath=item_path)
+        return set(bpy.data.objects) - existing_objects
+
     def import_item(self, item_path: str):
         try:
-            existing_objects = set(bpy.data.objects)
-            bpy.ops.import_scene.fbx(filepath=item_path)
-            new_objects = set(bpy.data.objects) - existing_objects
-            list_new_objects = [obj for obj in new_objects]
-            item = list_new_objects[0]
-            self.item = item
-            self.item_origin = "import"
+            item_path = os.path.abspath(item_path)
+            self._instance_prop(item_path, lambda: ItemManager._load_fbx(item_path))
         except Exception as e:
             raise RuntimeError(f"Error during item import: {e}")
 
@@ -36,53 +93,30 @@ class ItemManager:
         return copy
 
     def import_screwdriver(self, item_path: str):
-        existing_objects = set(bpy.data.objects)
         collection_name = "flathead_screwdriver"
         section = "Collection"
-        directory = os.path.join(item_path, section)
-        bpy.ops.wm.append(filepath=os.path.join(directory, collection_name),directory=directory, filename=collection_name)
-        new_objects = set(bpy.data.objects) - existing_objects
-        list_new_objects = [obj for obj in new_objects]
-        item = list_new_objects[0]
-        self.item = item
-        self.item_origin = "import"
+        directory = os.path.join(os.path.abspath(item_path), section)
+
+        def load():
+            existing_objects = set(bpy.data.objects)
+            bpy.ops.wm.append(filepath=os.path.join(directory, collection_name), directory=directory,
+                              filename=collection_name)
+            return set(bpy.data.objects) - existing_objects
+
+        self._instance_prop(os.path.join(directory, collection_name), load)
         print(self.item.name)
 
 
     def import_watering_can(self):
-        existing_objects = set(bpy.data.objects)
-        script_dir = os.getcwd()
-        watering_plant_path = os.path.join(script_dir, "assets", "items", "watering_can", "watering_can.fbx")
-        bpy.ops.import_scene.fbx(filepath=watering_plant_path)
-        new_objects = set(bpy.data.objects) - existing_objects
-        list_new_objects = [obj for obj in new_objects]
-        item = list_new_objects[0]
-        self.item = item
-        self.item_origin = "import"
+        self.import_item(os.path.join(ITEMS_DIR, "watering_can", "watering_can.fbx"))
 
 
     def import_glass(self):
-        existing_objects = set(bpy.data.objects)
-        script_dir = os.getcwd()
-        glass_path = os.path.join(script_dir, "assets", "items", "glass", "glass.fbx")
-        bpy.ops.import_scene.fbx(filepath=glass_path)
-        new_objects = set(bpy.data.objects) - existing_objects
-        list_new_objects = [obj for obj in new_objects]
-        item = list_new_objects[0]
-        self.item = item
-        self.item_origin = "import"
+        self.import_item(os.path.join(ITEMS_DIR, "glass", "glass.fbx"))
 
 
     def import_apple(self):
-        existing_objects = set(bpy.data.objects)
-        script_dir = os.getcwd()
-        wapple_path = os.path.join(script_dir, "assets", "items", "apple", "apple.fbx")
-        bpy.ops.import_scene.fbx(filepath=wapple_path)
-        new_objects = set(bpy.data.objects) - existing_objects
-        list_new_objects = [obj for obj in new_objects]
-        item = list_new_objects[0]
-        self.item = item
-        self.item_origin = "import"
+        self.import_item(os.path.join(ITEMS_DIR, "apple", "apple.fbx"))
 
 
 
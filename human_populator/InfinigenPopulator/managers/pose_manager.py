@@ -4,13 +4,13 @@ from random import random
 import bpy
 import numpy as np
 from numpy import radians
-import re
 
 from InfinigenPopulator.extras.utils import Utils
 from InfinigenPopulator.managers.character_manager import CharacterManager
-from InfinigenPopulator.managers.item_manager import ItemManager
+from InfinigenPopulator.managers.item_manager import ItemManager, ITEMS_DIR
 from InfinigenPopulator.extras.bone_mapping import bone_name_mapping, BONE_LOOKUPS
-from InfinigenPopulator.managers.scene_manager import SceneManager
+from InfinigenPopulator.managers.scene_analysis import SceneAnalysis
+from InfinigenPopulator.extras.character_index import CharacterIndex, get_characters_root
 # noinspection PyUnresolvedReferences
 from mathutils import Vector
 import math
@@ -21,10 +21,13 @@ IMPLEMENTED_POSES = ["waving", "fixing desk", "holding glass", "watering plant",
 
 
 class PoseManager:
-    def __init__(self, character_manager: CharacterManager):
+    def __init__(self, character_manager: CharacterManager, scene_analysis: SceneAnalysis = None):
         self.character_manager = character_manager
+        self.scene_analysis = scene_analysis or character_manager.scene_analysis or SceneAnalysis.get_shared()
         self.character = character_manager.character
-        self.rig_type = re.split(r"[_|-]", character_manager.character_name)[0].lower()
+        character_index = CharacterIndex.get(get_characters_root(character_manager.character_path))
+        record = character_index.get_record(character_manager.character_path) if character_index else None
+        self.rig_type = record["rig_type"] if record else CharacterIndex.get_rig_type(character_manager.character_name)
         print(self.rig_type)
         self.bone_lookup = BONE_LOOKUPS[self.rig_type]
         self.prev_obj = None
@@ -50,8 +53,7 @@ class PoseManager:
             case "smpl eating": self._set_eating_pose()
 
     def check_human_exists(self, objects):
-        all_objects = [obj.name for obj in bpy.context.scene.objects if obj.type != "CAMERA"]
-        humans = [name for name in all_objects if "SMPLX-lh" in name]
+        humans = self.scene_analysis.category_index.find("SMPLX-lh")
         # chosen_object = np.random.choice(objects)
 
         for human in humans:
@@ -68,11 +70,7 @@ class PoseManager:
         return chosen_object
 
     def _set_smpl_watering_plant(self):
-        temp_scene_manager = SceneManager()
-        temp_scene_manager.connect_loaded_scene()
-
-        objects = [obj.name for obj in bpy.context.scene.objects if obj.type != "CAMERA"]
-        all_plants = [name for name in objects if "LargePlantContainer" in name]
+        all_plants = self.scene_analysis.category_index.find("LargePlantContainer")
         plant = all_plants[0]
 
         plant_container = bpy.data.objects.get(plant)
@@ -90,9 +88,12 @@ class PoseManager:
         ]
 
         available_position = None
+        proxy = self.character_manager.get_collision_proxy()
         for i, offset in enumerate(candidate_offsets):
             candidate_position = plant_container.location + offset
-            free, colliding_obj = Utils.is_space_free(candidate_position, self.character, temp_scene_manager.floor)
+            free, colliding_obj = Utils.is_space_free(candidate_position, self.character, self.scene_analysis.floor,
+                                                      spatial_index=self.scene_analysis.spatial_index,
+                                                      proxy=proxy)
             if free:
                 available_position = candidate_position
                 print(f"Found free space next to plant at {candidate_position}")
@@ -114,14 +115,11 @@ class PoseManager:
         self.character_manager.relations["watering"] = plant_container.name
 
     def _set_eating_pose(self):
-        objects = [obj.name for obj in bpy.context.scene.objects if obj.type != "CAMERA"]
+        category_index = self.scene_analysis.category_index
         obj_names = ["ChairFactory"]
-        dining_object = bpy.data.objects.get([name for name in objects if "TableDiningFactory" in name and "spawn" in name][0])
-        sittable_objects = [obj for name in obj_names for obj in objects if name in obj]
-        sittable_objects = [name for name in sittable_objects if "spawn_asset" in name]
-        scene_manager = SceneManager()
-        scene_manager.connect_loaded_scene()
-        floor = bpy.data.objects.get(scene_manager.floor)
+        dining_object = bpy.data.objects.get(category_index.find("TableDiningFactory", name_contains="spawn")[0])
+        sittable_objects = [obj for name in obj_names for obj in category_index.find(name, spawn_asset=True)]
+        floor = bpy.data.objects.get(self.scene_analysis.floor)
         saved_height = floor.location[2]
         chosen_object = self.check_human_exists(sittable_objects)
         sitting_object = bpy.data.objects.get(chosen_object)
@@ -156,12 +154,8 @@ class PoseManager:
 
 
     def _set_sleeping_on_bed(self):
-        objects = [obj.name for obj in bpy.context.scene.objects if obj.type != "CAMERA"]
-        sittable_objects = [name for name in objects if "BedFactory" in name]
-        sittable_objects = [name for name in sittable_objects if "spawn_asset" in name]
-        scene_manager = SceneManager()
-        scene_manager.connect_loaded_scene()
-        floor = bpy.data.objects.get(scene_manager.floor)
+        sittable_objects = self.scene_analysis.category_index.find("BedFactory", spawn_asset=True)
+        floor = bpy.data.objects.get(self.scene_analysis.floor)
         saved_height = floor.location[2]
         chosen_object = self.check_human_exists(sittable_objects)
         sitting_object = bpy.data.objects.get(chosen_object)
@@ -180,13 +174,10 @@ class PoseManager:
         print("Set sleeping on bed pose!")
 
     def _set_sitting_on_chair_pose(self):
-        objects = [obj.name for obj in bpy.context.scene.objects if obj.type != "CAMERA"]
+        category_index = self.scene_analysis.category_index
         obj_names = ["ChairFactory", "SofaFactory", "BedFactory"]
-        sittable_objects = [obj for name in obj_names for obj in objects if name in obj]
-        sittable_objects = [name for name in sittable_objects if "spawn_asset" in name]
-        scene_manager = SceneManager()
-        scene_manager.connect_loaded_scene()
-        floor = bpy.data.objects.get(scene_manager.floor)
+        sittable_objects = [obj for name in obj_names for obj in category_index.find(name, spawn_asset=True)]
+        floor = bpy.data.objects.get(self.scene_analysis.floor)
         saved_height = floor.location[2]
         chosen_object = self.check_human_exists(sittable_objects)
         sitting_object = bpy.data.objects.get(chosen_object)
@@ -218,12 +209,10 @@ class PoseManager:
         print("Set working on computer pose!")
 
     def _set_working_on_computer(self):
-        objects = [obj.name for obj in bpy.context.scene.objects if obj.type != "CAMERA"]
-        monitor_objects = [name for name in objects if "MonitorFactory" in name]
-        monitor_table = bpy.data.objects.get([name for name in objects if "SimpleDeskFactory" in name and "spawn" in name][0])
-        scene_manager = SceneManager()
-        scene_manager.connect_loaded_scene()
-        floor = bpy.data.objects.get(scene_manager.floor)
+        category_index = self.scene_analysis.category_index
+        monitor_objects = category_index.find("MonitorFactory")
+        monitor_table = bpy.data.objects.get(category_index.find("SimpleDeskFactory", name_contains="spawn")[0])
+        floor = bpy.data.objects.get(self.scene_analysis.floor)
         saved_height = floor.location[2]
 
         chosen_monitor = np.random.choice(monitor_objects)
@@ -280,9 +269,7 @@ class PoseManager:
         self.character_manager.pose = pose_name
         sitting_poses = ["playing-guitar-sitting"]
         sitting_predicates = ["playing the "]
-        scene_manager = SceneManager()
-        scene_manager.connect_loaded_scene()
-        _, sittable_objs = scene_manager.check_for_object_to_sit_on()
+        _, sittable_objs = self.scene_analysis.sittable_objects
         obj_to_sit_on_name = np.random.choice(sittable_objs)
         obj_to_sit_on = bpy.data.objects.get(obj_to_sit_on_name)
         print("Object to sit on: ", obj_to_sit_on)
@@ -295,9 +282,7 @@ class PoseManager:
         self.character_manager.pose = pose_name
         floor_poses = ["doing-situps", "doing-yoga", "sitting-on-floor"]
         floor_predicates = ["doing situps on ", "doing yoga on", "sitting on "]
-        scene_manager = SceneManager()
-        scene_manager.connect_loaded_scene()
-        floor = scene_manager.get_floor_with_most_objects_above()
+        floor = self.scene_analysis.floor
 
         obj_interaction_poses = ["checking-time-on-pocket-watch", "presenting-garden-gnome", "playing-guitar"]
         obj_interaction_predicates = ["checking time on ", "presenting ", "playing the "]
@@ -395,11 +380,8 @@ class PoseManager:
             item_manager.move_item((0.03, 0.0, -0.02))
 
     def _set_touching_chair(self):
-        objects = [obj.name for obj in bpy.context.scene.objects if obj.type != "CAMERA"]
-        chair_objects = [name for name in objects if "ChairFactory" in name]
-        scene_manager = SceneManager()
-        scene_manager.connect_loaded_scene()
-        floor = bpy.data.objects.get(scene_manager.floor)
+        chair_objects = self.scene_analysis.category_index.find("ChairFactory")
+        floor = bpy.data.objects.get(self.scene_analysis.floor)
         saved_height = floor.location[2]
 
         print(chair_objects)
@@ -468,8 +450,7 @@ class PoseManager:
         print("Set touching chair pose!")
 
     def _set_fixing_desk(self):
-        objects = [obj.name for obj in bpy.context.scene.objects if obj.type != "CAMERA"]
-        simple_desk_objects = [name for name in objects if "SimpleDeskFactory" in name]
+        simple_desk_objects = self.scene_analysis.category_index.find("SimpleDeskFactory")
         valid_desks = []
         if simple_desk_objects:
             for desk in simple_desk_objects:
@@ -487,8 +468,7 @@ class PoseManager:
         self.character.location = chosen_desk.location + Vector((0.0, -1.7, -0.50))
         self.character_manager.rotate_character(180)
         item_manager = ItemManager()
-        item_manager.import_item(
-            "/home/nico/dev/hiwi/scenes/InfinigenPopulator/assets/items/screwdriver/screwdriver.fbx")
+        item_manager.import_item(os.path.join(ITEMS_DIR, "screwdriver", "screwdriver.fbx"))
         self._put_item_in_hand(item_manager, "Right")
         self.character_manager.relations["fixes"] = chosen_desk.name
         item_manager.rotate_item((0, 90, 0))
@@ -534,11 +514,7 @@ class PoseManager:
 
     def _set_watering_plant(self):
         self._set_arms_down()
-        temp_scene_manager = SceneManager()
-        temp_scene_manager.connect_loaded_scene()
-
-        objects = [obj.name for obj in bpy.context.scene.objects if obj.type != "CAMERA"]
-        all_plants = [name for name in objects if "PlantContainer" in name]
+        all_plants = self.scene_analysis.category_index.find("PlantContainer")
         plant = all_plants[0]
 
         plant_container = bpy.data.objects.get(plant)
@@ -557,9 +533,12 @@ class PoseManager:
 
         available_position = None
         offset_i = None
+        proxy = self.character_manager.get_collision_proxy()
         for i, offset in enumerate(candidate_offsets):
             candidate_position = plant_container.location + offset
-            free, colliding_obj = Utils.is_space_free(candidate_position, self.character, temp_scene_manager.floor)
+            free, colliding_obj = Utils.is_space_free(candidate_position, self.character, self.scene_analysis.floor,
+                                                      spatial_index=self.scene_analysis.spatial_index,
+                                                      proxy=proxy)
             if free:
                 available_position = candidate_position
                 offset_i = i
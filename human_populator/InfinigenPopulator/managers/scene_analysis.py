@@ -0,0 +1,96 @@
+from collections import defaultdict
+
+import bpy
+
+from InfinigenPopulator.extras.utils import Utils
+from InfinigenPopulator.managers.scene_manager import SceneManager
+
+
+class SceneAnalysis:
+    """
+    Shared, memoized analysis of the loaded scene (floor, floor area, floor polygon, valid poses and the scene
+    indices), injected into PoseManager and CharacterManager instead of a fresh SceneManager per pose call.
+    Values are computed on first use and kept until the scene changes structurally, i.e. another file or scene
+    is loaded or invalidate() is called. Adding characters does not count as a structural change.
+    """
+    _shared = None
+
+    def __init__(self, scene_manager: SceneManager):
+        self.scene_manager = scene_manager
+        self._values = {}
+        self._signature = None
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    @classmethod
+    def get_shared(cls):
+        """Returns the analysis of the currently loaded scene for callers that had none injected."""
+        if cls._shared is None or cls._shared._signature not in (None, cls._get_signature()):
+            scene_manager = SceneManager()
+            scene_manager.connect_loaded_scene()
+            cls._shared = cls(scene_manager)
+        return cls._shared
+
+    @classmethod
+    def set_shared(cls, scene_analysis):
+        cls._shared = scene_analysis
+
+    @staticmethod
+    def _get_signature():
+        return bpy.data.filepath, bpy.data.scenes[0].name
+
+    def invalidate(self):
+        self._values.clear()
+        self._signature = None
+
+    def _get(self, key, compute):
+        signature = SceneAnalysis._get_signature()
+        if signature != self._signature:
+            self._values.clear()
+            self._signature = signature
+        if key in self._values:
+            self.hits[key] += 1
+        else:
+            self.misses[key] += 1
+            self._values[key] = compute()
+        return self._values[key]
+
+    @property
+    def floor(self):
+        return self._get("floor", self._compute_floor)
+
+    def _compute_floor(self):
+        if self.scene_manager.floor is None:
+            self.scene_manager.floor = self.scene_manager.get_floor_with_most_objects_above()
+        return self.scene_manager.floor
+
+    @property
+    def floor_area(self):
+        self.scene_manager.floor = self.floor
+        return self._get("floor_area", self.scene_manager.get_floor_area)
+
+    @property
+    def floor_polygon(self):
+        return self._get("floor_polygon", lambda: Utils.get_floor_polygon(bpy.data.objects.get(self.floor))[2])
+
+    @property
+    def valid_poses(self):
+        """A copy of the valid poses, so callers may consume it."""
+        return list(self._get("valid_poses", self.scene_manager.get_valid_poses))
+
+    @property
+    def sittable_objects(self):
+        return self._get("sittable_objects", self.scene_manager.check_for_object_to_sit_on)
+
+    @property
+    def spatial_index(self):
+        return self.scene_manager.spatial_index
+
+    @property
+    def category_index(self):
+        return self.scene_manager.category_index
+
+    def get_stats(self):
+        """Returns {value name: {"hits": n, "misses": n}} for all values requested so far."""
+        return {key: {"hits": self.hits[key], "misses": self.misses[key]}
+                for key in sorted(set(self.hits) | set(self.misses))}
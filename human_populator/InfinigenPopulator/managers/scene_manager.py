@@ -1,35 +1,45 @@
 import bpy
 # noinspection PyUnresolvedReferences
 from mathutils import Vector
+import numpy as np
+from InfinigenPopulator.extras.spatial_index import SpatialIndex, get_world_aabbs
+from InfinigenPopulator.extras.category_index import CategoryIndex
+from InfinigenPopulator.extras.mesh_arrays import get_polygon_normals, get_polygon_areas
 
 class SceneManager:
     def __init__(self):
         self.scene = None
         self.floor = None
+        self.spatial_index = None
+        self.category_index = None
 
     def connect_loaded_scene(self):
         try:
             self.scene = bpy.data.scenes[0]
+            self.spatial_index = SpatialIndex.get_active()
+            self.category_index = CategoryIndex.get_active()
             self.floor = self.get_floor_with_most_objects_above()
         except Exception as e:
             raise RuntimeError(f"Error connecting scene to SceneManager: {e}")
 
     def get_floor_area(self):
-        total_floor_area = 0.0
-        for obj in self.scene.objects:
-            if obj.name == self.floor:
-                mesh = obj.data
-                for face in mesh.polygons:
-                    if abs(face.normal.dot((0, 0, 1))) > 0.999:
-                        total_floor_area += face.area
-
-        return total_floor_area
+        """Returns the summed area of the horizontal faces of the floor mesh."""
+        floor = self.scene.objects.get(self.floor)
+        if floor is None:
+            return 0.0
+        normals = get_polygon_normals(floor.data)
+        areas = get_polygon_areas(floor.data)
+        return float(areas[np.abs(normals[:, 2]) > 0.999].sum())
 
 
     def load_scene(self, scene_path):
         try:
             bpy.ops.wm.open_mainfile(filepath=scene_path)
             self.scene = bpy.data.scenes[0]
+            self.spatial_index = SpatialIndex.from_scene(self.scene)
+            SpatialIndex.set_active(self.spatial_index)
+            self.category_index = CategoryIndex.from_scene(self.scene)
+            CategoryIndex.set_active(self.category_index)
             self.floor = self.get_floor_with_most_objects_above()
             print("Floor OBJ", self.floor)
             for obj in bpy.data.objects:
@@ -54,11 +64,10 @@ class SceneManager:
 
 
     def check_for_object_to_sit_on(self):
-        objects = [obj.name for obj in self.scene.objects if obj.type != "CAMERA"]
         sittable_names = ["Dishwasher", "Bed", "Fridge", "WashingMachine", "Sofa"]
         sittable_objects = []
         for name in sittable_names:
-            found_sittable = [obj for obj in objects if name in obj]
+            found_sittable = self.category_index.find(name)
             if found_sittable:
                 sittable_objects.extend(found_sittable)
         if sittable_objects:
@@ -70,33 +79,35 @@ class SceneManager:
 
 
     def get_floor_with_most_objects_above(self):
-        floor_object_count = {}
-        floors = [obj for obj in self.scene.objects if "floor" in obj.name.lower()]
-        for floor in floors:
-            bbox_world = [floor.matrix_world @ Vector(corner) for corner in floor.bound_box]
-            min_coords = Vector(
-                (min(v.x for v in bbox_world), min(v.y for v in bbox_world), min(v.z for v in bbox_world)))
-            max_coords = Vector(
-                (max(v.x for v in bbox_world), max(v.y for v in bbox_world), max(v.z for v in bbox_world)))
-            floor_object_count[floor.name] = 0
-            for obj in self.scene.objects:
-                if obj == floor or "floor" in obj.name.lower() or obj.type != "MESH":  # Skip floor objects
-                    continue
-                obj_location = obj.location
-                if (min_coords.x <= obj_location.x <= max_coords.x and
-                        min_coords.y <= obj_location.y <= max_coords.y and
-                        max_coords.z < obj_location.z <= max_coords.z + 1):
-                    floor_object_count[floor.name] += 1
-        floor_with_most_objects = max(floor_object_count, key=floor_object_count.get)
+        """
+        Returns the name of the floor with the most mesh objects located above it (within 1 m of its top). All
+        locations are gathered in a single pass and counted against the F x 6 floor bounds in one broadcast.
+        """
+        floors = []
+        locations = []
+        for obj in self.scene.objects:
+            if "floor" in obj.name.lower():
+                floors.append(obj)
+            elif obj.type == "MESH":
+                locations.append(tuple(obj.location))
+        if not floors:
+            raise ValueError("No floor found in the scene!")
+        floor_bounds = get_world_aabbs(floors)[:, :, None]
+        locations = np.array(locations).reshape(-1, 3).T[None, :, :]
+
+        is_above = ((floor_bounds[:, 0] <= locations[:, 0]) & (locations[:, 0] <= floor_bounds[:, 3]) &
+                    (floor_bounds[:, 1] <= locations[:, 1]) & (locations[:, 1] <= floor_bounds[:, 4]) &
+                    (floor_bounds[:, 5] < locations[:, 2]) & (locations[:, 2] <= floor_bounds[:, 5] + 1))
+        floor_object_count = is_above.sum(axis=1)
+        floor_with_most_objects = floors[int(np.argmax(floor_object_count))].name
         return floor_with_most_objects
 
     def get_valid_poses(self):
-        objects = [obj.name for obj in self.scene.objects if obj.type != "CAMERA"]
 
         # valid_poses = ["waving", "holding apple", "holding glass", "arms down"]
         valid_poses = ["smpl"]
         #for now disabled
-        """simple_desk_objects = [name for name in objects if "SimpleDeskFactory" in name]
+        """simple_desk_objects = self.category_index.find("SimpleDeskFactory")
         valid_desks = []
         if simple_desk_objects:
             for desk in simple_desk_objects:
@@ -106,12 +117,12 @@ class SceneManager:
             if valid_desks:
                 valid_poses.append("fixing desk")"""
 
-        plants = [name for name in objects if "LargePlantContainer" in name]
+        plants = self.category_index.find("LargePlantContainer")
         if plants:
             valid_poses.append("watering plant")
 
-        chairs = [name for name in objects if "ChairFactory" in name and "spawn_asset" in name]
-        sofa = [name for name in objects if "SofaFactory" in name and "spawn_asset" in name]
+        chairs = self.category_index.find("ChairFactory", spawn_asset=True)
+        sofa = self.category_index.find("SofaFactory", spawn_asset=True)
         if chairs or sofa:
             # valid_poses.append("touching chair")
             num_char = 2 if len(chairs) > 4 else 1
@@ -120,13 +131,13 @@ class SceneManager:
             num_char = 2 if len(chairs) >= 4 else 1
             valid_poses.extend(["smpl eating"] * num_char)
 
-        beds = [name for name in objects if "BedFactory" in name and "spawn_asset" in name]
+        beds = self.category_index.find("BedFactory", spawn_asset=True)
         if beds:
             # valid_poses.append("touching chair")
             num_char = 2 if len(beds) > 1 else 1
             valid_poses.extend(["smpl sleeping on bed"] * num_char)
 
-        monitor = [name for name in objects if "MonitorFactory" in name]
+        monitor = self.category_index.find("MonitorFactory")
         if monitor:
             valid_poses.append("smpl working on computer")
 
@@ -1,13 +1,14 @@
 #!/usr/bin/env python3
 import os
 import argparse
-import shutil
 
-import numpy as np
-
-from InfinigenPopulator.logic.blender_logic import process_scene
-from InfinigenPopulator.logic.render_logic import render_images_gt
-from InfinigenPopulator.extras.verification import verify_characters, verify_scene, verify_infinigen, verify_output_root
+from InfinigenPopulator.logic.batch_logic import populate_scene, populate_batch
+from InfinigenPopulator.logic.worker_pool import WorkerPool
+from InfinigenPopulator.logic.pipeline import PopulateRenderPipeline
+from InfinigenPopulator.logic.render_logic import RENDER_MODES, RENDER_PROFILES
+from InfinigenPopulator.logic.blender_logic import CAMERA_SELECTIONS
+from InfinigenPopulator.extras.verification import verify_infinigen, verify_output_root
+from InfinigenPopulator.extras.character_index import get_characters
 
 from infinigen_examples.generate_nature import main as infinigen_render
 
@@ -15,49 +16,88 @@ from infinigen_examples.generate_nature import main as infinigen_render
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("input_folder")
+    parser.add_argument("input_folder",
+                        help="Seed folder to populate, or with --batch a root of seed folders or a manifest file.")
     parser.add_argument("output_root")
     parser.add_argument("characters")
+    parser.add_argument("--exact-collisions", action="store_true",
+                        help="Re-check ground placements rejected by the bbox tests against the exact meshes (BVH).")
+    parser.add_argument("--batch", action="store_true",
+                        help="Process every seed folder of input_folder in one Blender session.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="With --batch, populate the seed folders in this many worker processes.")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="With --batch, populate the next scene while the previous one renders.")
+    parser.add_argument("--pipeline-queue-size", type=int, default=1,
+                        help="With --pipeline, the number of populated scenes that may wait for rendering.")
+    parser.add_argument("--cameras", default="all",
+                        help="Camera rigs to render: 'all', 'new' (only the ones added for characters) or a "
+                             "comma-separated list of rig indices, e.g. 0,3.")
+    parser.add_argument("--render-mode", choices=RENDER_MODES, default=None,
+                        help="'legacy' launches generate_indoors twice per camera, 'single-process' renders the full "
+                             "and flat passes of all cameras in one process, 'concurrent' runs --render-jobs renders "
+                             "at a time. Defaults to 'legacy', with --workers to 'single-process'.")
+    parser.add_argument("--render-jobs", type=int, default=2,
+                        help="With --render-mode concurrent, the number of renders running at the same time.")
+    parser.add_argument("--render-threads", type=int, default=None,
+                        help="With --render-mode concurrent, the cores split between the renders (default: all).")
+    parser.add_argument("--keep-going", action="store_true",
+                        help="With --render-mode concurrent, attempt all renders of a scene even if one fails.")
+    parser.add_argument("--render-profile", choices=tuple(RENDER_PROFILES), default="production",
+                        help="'draft' renders at low resolution with few samples and no denoising into draft/frames, "
+                             "for a quick look at the population.")
+    parser.add_argument("--skip-flat", action="store_true",
+                        help="Only render the full images, without the flat ground truth.")
+    parser.add_argument("--population-seed", type=int, default=0,
+                        help="Base seed of the population, combined with the seed folder name per scene.")
+    parser.add_argument("--no-population-cache", action="store_true",
+                        help="Always populate in Blender instead of reusing a cached population of the same inputs.")
 
     args = parser.parse_args()
+    camera_selection = args.cameras
+    if camera_selection not in CAMERA_SELECTIONS:
+        try:
+            camera_selection = [int(rig_id) for rig_id in camera_selection.split(",")]
+        except ValueError:
+            parser.error(f"--cameras must be one of {CAMERA_SELECTIONS} or a list of rig indices.")
+    if args.pipeline and args.workers > 1:
+        parser.error("--pipeline and --workers cannot be combined.")
+    if args.render_mode is None:
+        args.render_mode = "single-process" if args.batch and args.workers > 1 else "legacy"
+    elif args.render_mode == "legacy" and args.batch and args.workers > 1:
+        parser.error("--workers needs --render-mode single-process or concurrent, legacy renders use all cores.")
     infinigen_path = os.path.dirname(os.path.dirname(infinigen_render.__code__.co_filename))
 
     infinigen_path = verify_infinigen(infinigen_path)
-    input_path = args.input_folder
-    input_scene = verify_scene(input_path)
     output_root = verify_output_root(args.output_root)
-    available_characters = verify_characters(args.characters)
-
-    seed = os.path.basename(input_path)
-    if not seed:
-        input_path_new = input_path[:-1]
-        seed = os.path.basename(input_path_new)
-    print("Scene Seed: ", seed)
-
-    output_scene_dir = os.path.join(output_root, str(seed))
-    os.makedirs(output_scene_dir, exist_ok=True)
-
-    scene_dir = os.path.join(output_scene_dir, "fine")
-    os.makedirs(scene_dir, exist_ok=True)
-
-    input_path = os.path.dirname(input_scene)
-    masktag_path = os.path.join(input_path, "MaskTag.json")
-    shutil.copy(masktag_path, scene_dir)
-
-    output_scene = os.path.join(scene_dir, "scene.blend")
-
-    print("\n=== Processing scene in Blender ===")
-    camera_id_list = process_scene(input_scene, output_scene, available_characters)
-    print("Cameras to render: ", len(camera_id_list))
-
-    render_dir = os.path.join(output_scene_dir, "frames")
-    os.makedirs(render_dir, exist_ok=True)
-
-    os.chdir(infinigen_path)
-
-
-    print("\n=== Running infinigen ===")
-    render_images_gt(scene_dir, render_dir, seed, camera_id_list)
+    available_characters = get_characters(args.characters)
+    population_options = {"seed": args.population_seed, "cache": not args.no_population_cache}
+    render_options = {"profile": args.render_profile, "skip_flat": args.skip_flat}
+    if args.render_mode == "concurrent":
+        render_options.update({"jobs": args.render_jobs, "total_threads": args.render_threads,
+                               "keep_going": args.keep_going})
+
+    if args.batch:
+        if args.pipeline:
+            pipeline = PopulateRenderPipeline(output_root, available_characters, infinigen_path,
+                                              args.exact_collisions, args.render_mode, render_options,
+                                              camera_selection, population_options, args.pipeline_queue_size)
+            summary = pipeline.run(args.input_folder)
+        elif args.workers > 1:
+            worker_pool = WorkerPool(args.workers, output_root, available_characters, infinigen_path,
+                                     args.exact_collisions, args.render_mode, render_options, camera_selection,
+                                     population_options)
+            summary = worker_pool.run(args.input_folder)
+        else:
+            summary = populate_batch(args.input_folder, output_root, available_characters, infinigen_path,
+                                     args.exact_collisions, args.render_mode, render_options, camera_selection,
+                                     population_options)
+        if summary["failed"]:
+            raise SystemExit(1)
+        return
+
+    populate_scene(args.input_folder, output_root, available_characters, infinigen_path, args.exact_collisions,
+                   args.render_mode, render_options, camera_selection, population_options)
     print("All steps completed successfully.")
 
 if __name__ == "__main__":